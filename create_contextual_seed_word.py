@@ -1,24 +1,52 @@
 #!/usr/bin/env python3
 """
 Script to merge a diary narrative with a prompt template and run it on Ollama.
-Takes a path to a diary narrative txt file, merges it with the template,
-and runs the finalized prompt on the gpt-oss:20b model.
+Takes one or more paths to diary narrative txt files, merges each with the template,
+and runs the finalized prompts on the gpt-oss:20b model. Multiple narratives are
+submitted concurrently so Ollama can batch them together.
 """
 
 import argparse
+import atexit
+import datetime
+import functools
 import json
-import re
+import os
 import requests
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any, Tuple, Optional
 
+from llm_response import JsonScanner
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
+
+def read_text_file(path: str) -> str:
+    """Read a whole UTF-8 text file with a single os.read sized from fstat."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        data = os.read(fd, os.fstat(fd).st_size)
+    finally:
+        os.close(fd)
+    return data.decode('utf-8')
+
+
+@functools.lru_cache(maxsize=8)
+def read_template_cached(template_path: str, mtime_ns: int) -> str:
+    """Read a template file, cached per (path, modification time)."""
+    return read_text_file(template_path)
+
 
 def load_template(template_path: str) -> str:
     """Load the prompt template from file."""
     try:
-        with open(template_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return read_template_cached(template_path, os.stat(template_path).st_mtime_ns)
     except FileNotFoundError:
         print(f"Error: Template file not found: {template_path}", file=sys.stderr)
         sys.exit(1)
@@ -30,8 +58,7 @@ def load_template(template_path: str) -> str:
 def load_diary_narrative(narrative_path: str) -> str:
     """Load the diary narrative from file."""
     try:
-        with open(narrative_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+        return read_text_file(narrative_path).strip()
     except FileNotFoundError:
         print(f"Error: Diary narrative file not found: {narrative_path}", file=sys.stderr)
         sys.exit(1)
@@ -40,6 +67,93 @@ def load_diary_narrative(narrative_path: str) -> str:
         sys.exit(1)
 
 
+# Common placeholder patterns
+PLACEHOLDERS = ['<<<DIARY_NARRATIVE>>>', '<<<NARRATIVE>>>', '<<<DAY_SUMMARY>>>', '<<>>']
+
+# How long Ollama keeps the model (and its prompt cache) loaded between requests
+OLLAMA_KEEP_ALIVE = "30m"
+
+# (connect, read) timeouts in seconds: fail fast if Ollama is unreachable, but allow
+# up to 10 minutes between response bytes for large models
+OLLAMA_TIMEOUT = (10, 600)
+
+# Default number of requests sent to Ollama at the same time when batching narratives
+DEFAULT_MAX_CONCURRENCY = 4
+
+# JSON schema passed as Ollama's "format" so the model is constrained to emit bare JSON
+CANDIDATES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "candidates": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "word": {"type": "string"},
+                    "distinct_letters": {"type": "array", "items": {"type": "string"}},
+                    "clue": {"type": "string"}
+                },
+                "required": ["word", "distinct_letters", "clue"]
+            }
+        }
+    },
+    "required": ["candidates"]
+}
+
+# Decoder used to parse a single JSON value embedded in surrounding text
+JSON_DECODER = json.JSONDecoder()
+
+# Every ASCII byte except a-z/A-Z, deleted when pulling letters out of a string
+NON_LETTER_BYTES = bytes(c for c in range(128) if not chr(c).isalpha())
+
+
+def create_session(pool_connections: int = 8, pool_maxsize: int = 16) -> requests.Session:
+    """Create a requests session with a keep-alive connection pool for Ollama."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared session so every request reuses the same TCP connections to Ollama
+OLLAMA_SESSION = create_session()
+
+
+@functools.lru_cache(maxsize=8)
+def split_template(template: str) -> Tuple[Tuple[str, ...], bool]:
+    """Split the template on its placeholders once, cached across narratives.
+    
+    Returns:
+        Tuple of (segments, had_placeholder); the narrative belongs between
+        each pair of consecutive segments
+    """
+    segments = [template]
+    for placeholder in PLACEHOLDERS:
+        segments = [part for segment in segments for part in segment.split(placeholder)]
+    return tuple(segments), len(segments) > 1
+
+
+def split_prompt(template: str, narrative: str) -> Tuple[str, str]:
+    """Split the merged prompt into a template prefix and a narrative-dependent suffix.
+    
+    The prefix is the template text up to the first placeholder, so it is identical
+    for every narrative merged with the same template and Ollama can reuse its
+    cached prompt state for it. The suffix holds the rest of the template with
+    every placeholder replaced by the narrative text.
+    If no placeholder is found, the narrative is appended to the template.
+    """
+    segments, had_placeholder = split_template(template)
+    
+    # If no placeholder was found, append the narrative
+    if not had_placeholder:
+        if template.strip():
+            return template + "\n\n", narrative
+        return "", narrative
+    
+    return segments[0], narrative + narrative.join(segments[1:])
+
+
 def merge_prompt(template: str, narrative: str) -> str:
     """Merge the template with the diary narrative.
     
@@ -47,40 +161,94 @@ def merge_prompt(template: str, narrative: str) -> str:
     they will be replaced with the narrative text.
     Otherwise, the narrative will be appended to the template.
     """
-    # Common placeholder patterns
-    placeholders = ['<<<DIARY_NARRATIVE>>>', '<<<NARRATIVE>>>', '<<<DAY_SUMMARY>>>', '<<>>']
-    
-    merged = template
-    replaced = False
-    
-    for placeholder in placeholders:
-        if placeholder in merged:
-            merged = merged.replace(placeholder, narrative)
-            replaced = True
-    
-    # If no placeholder was found, append the narrative
-    if not replaced:
-        if template.strip():
-            merged = template + "\n\n" + narrative
-        else:
-            merged = narrative
+    prefix, suffix = split_prompt(template, narrative)
+    return prefix + suffix
+
+
+def json_loads(data: str) -> Any:
+    """Parse JSON text, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(data: Any) -> str:
+    """Serialize data as indented JSON text, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    return json.dumps(data, indent=2)
+
+
+def save_json(data: Any, output_path: str) -> None:
+    """Write data to a file as indented JSON, using orjson when it is available."""
+    if orjson is not None:
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+def is_candidates_object(json_str: str) -> bool:
+    """Return True if the string parses to a JSON object with a 'candidates' field."""
+    try:
+        parsed = json_loads(json_str)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(parsed, dict) and 'candidates' in parsed
+
+
+def find_first_json_object(text: str) -> Optional[str]:
+    """Return the first complete, valid JSON object in the text, or None.
     
-    return merged
+    Each '{' is handed to json.JSONDecoder.raw_decode, which parses one value in C
+    and reports where it ends, so braces in prose and malformed fragments are skipped.
+    """
+    start = text.find('{')
+    while start != -1:
+        try:
+            _, end = JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            start = text.find('{', start + 1)
+            continue
+        return text[start:end]
+    return None
 
 
 def extract_json_from_response(response: str) -> Optional[str]:
-    """Extract JSON from response, handling markdown code blocks and extra text."""
+    """Extract JSON from response, handling markdown code blocks and extra text.
+    
+    Uses json.JSONDecoder.raw_decode rather than greedy DOTALL regexes,
+    which backtrack badly on long responses.
+    """
+    # Fast path: structured output is already a bare JSON object
+    stripped = response.strip()
+    if stripped.startswith('{') and stripped.endswith('}'):
+        return stripped
+    
     # Try to find JSON in markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
-    if json_match:
-        return json_match.group(1)
+    fence = response.find('```')
+    if fence != -1:
+        json_str = find_first_json_object(response[fence:])
+        if json_str is not None:
+            return json_str
     
     # Try to find JSON object directly
-    json_match = re.search(r'(\{.*\})', response, re.DOTALL)
-    if json_match:
-        return json_match.group(1)
-    
-    return None
+    return find_first_json_object(response)
+
+
+def letter_mask(text: str) -> int:
+    """Return a 26-bit mask with bit i set if letter chr(ord('a') + i) occurs in the lowercase text."""
+    mask = 0
+    for byte in text.encode('ascii', 'ignore'):
+        if 97 <= byte <= 122:
+            mask |= 1 << (byte - 97)
+    return mask
+
+
+def mask_letters(mask: int) -> List[str]:
+    """Return the sorted letters whose bits are set in a letter_mask value."""
+    return [chr(97 + i) for i in range(26) if mask >> i & 1]
 
 
 def validate_candidate(candidate: Dict[str, Any], index: int, narrative: str) -> List[str]:
@@ -104,58 +272,67 @@ def validate_candidate(candidate: Dict[str, Any], index: int, narrative: str) ->
     distinct_letters_raw = candidate['distinct_letters']
     clue = candidate['clue']
     
-    # Validate word is not empty
+    # Validate word is not empty and made of plain letters only
     if not word:
         errors.append(f"Candidate {index}: 'word' is empty")
+    elif not (word.isascii() and word.isalpha()):
+        errors.append(f"Candidate {index}: Word '{word}' must contain only the letters a-z")
     
     # Validate word length (must be at least 7 characters)
     if len(word) < 7:
         errors.append(f"Candidate {index}: Word '{word}' is too short (must be at least 7 characters)")
     
+    # Validate clue is not empty
+    if not clue or not clue.strip():
+        errors.append(f"Candidate {index}: 'clue' is empty")
+    
     # Handle distinct_letters - can be a list or string
     if isinstance(distinct_letters_raw, list):
         distinct_letters = [str(letter).lower().strip() for letter in distinct_letters_raw]
     elif isinstance(distinct_letters_raw, str):
         # Handle string like "['w', 'a', 'l', 'k', 'i', 'n', 'g']" or "w, a, l, k, i, n, g"
-        distinct_letters = [letter.lower().strip().strip("'\"") 
-                           for letter in re.findall(r"[a-zA-Z]", distinct_letters_raw)]
+        ascii_letters = distinct_letters_raw.encode('ascii', 'ignore').translate(None, NON_LETTER_BYTES)
+        distinct_letters = list(ascii_letters.decode('ascii').lower())
     else:
         errors.append(f"Candidate {index}: 'distinct_letters' must be a list or string")
         return errors
     
+    # The masks below only see a-z, so anything else in the list must be reported here
+    invalid_letters = [letter for letter in distinct_letters if len(letter) != 1 or not 'a' <= letter <= 'z']
+    if invalid_letters:
+        errors.append(f"Candidate {index}: distinct_letters must be single letters a-z, got: {invalid_letters}")
+        return errors
+    
+    word_mask = letter_mask(word)
+    distinct_mask = letter_mask(''.join(distinct_letters))
+    
+    # Common case: the list names exactly the word's 7 distinct letters, once each
+    if word_mask == distinct_mask and word_mask.bit_count() == 7 and len(distinct_letters) == 7:
+        return errors
+    
     # Validate exactly 7 distinct letters
     if len(distinct_letters) != 7:
         errors.append(f"Candidate {index}: Word '{word}' has {len(distinct_letters)} distinct letters, expected 7")
     
     # Check for duplicates in distinct_letters
-    if len(set(distinct_letters)) != len(distinct_letters):
+    if distinct_mask.bit_count() < len(distinct_letters):
         errors.append(f"Candidate {index}: Word '{word}' has duplicate letters in distinct_letters list")
-        distinct_letters = list(set(distinct_letters))  # Deduplicate for further checks
-    
-    # Validate that distinct_letters actually match the letters in the word
-    word_letters = set(word)
-    distinct_letters_set = set(distinct_letters)
     
     # Check that all distinct_letters are in the word
-    missing_letters = distinct_letters_set - word_letters
+    missing_letters = mask_letters(distinct_mask & ~word_mask)
     if missing_letters:
-        errors.append(f"Candidate {index}: Word '{word}' does not contain distinct letters: {sorted(missing_letters)}")
+        errors.append(f"Candidate {index}: Word '{word}' does not contain distinct letters: {missing_letters}")
     
     # Check that the word has exactly 7 distinct letters (not more, not less)
-    if len(word_letters) != 7:
-        errors.append(f"Candidate {index}: Word '{word}' actually has {len(word_letters)} distinct letters, not 7")
+    if word_mask.bit_count() != 7:
+        errors.append(f"Candidate {index}: Word '{word}' actually has {word_mask.bit_count()} distinct letters, not 7")
     
     # Check that distinct_letters exactly matches the word's distinct letters
-    if word_letters != distinct_letters_set:
-        extra_in_word = word_letters - distinct_letters_set
-        if extra_in_word:
-            errors.append(f"Candidate {index}: Word '{word}' contains extra distinct letters not in the list: {sorted(extra_in_word)}")
-        if missing_letters:
-            errors.append(f"Candidate {index}: distinct_letters list contains letters not in the word: {sorted(missing_letters)}")
-    
-    # Validate clue is not empty
-    if not clue or not clue.strip():
-        errors.append(f"Candidate {index}: 'clue' is empty")
+    extra_in_word = mask_letters(word_mask & ~distinct_mask)
+    if extra_in_word:
+        errors.append(f"Candidate {index}: Word '{word}' contains extra distinct letters not in the list: {extra_in_word}")
+    if missing_letters:
+        errors.append(f"Candidate {index}: distinct_letters list contains letters not in the word: {missing_letters}")
     
     return errors
 
@@ -168,14 +345,14 @@ def sanity_check_response(response: str, narrative: str) -> Tuple[bool, Optional
     """
     errors = []
     
-    # Try to extract JSON from response
+    # Try to extract JSON from response (returns bare JSON responses as-is)
     json_str = extract_json_from_response(response)
     if json_str is None:
         return False, None, ["Could not find JSON in response. The response may not be valid JSON."]
     
     # Parse JSON
     try:
-        parsed = json.loads(json_str)
+        parsed = json_loads(json_str)
     except json.JSONDecodeError as e:
         return False, None, [f"Invalid JSON: {e}"]
     
@@ -210,21 +387,65 @@ def sanity_check_response(response: str, narrative: str) -> Tuple[bool, Optional
     return is_valid, parsed, errors
 
 
-def query_ollama(prompt: str, model: str = "gpt-oss:20b", ollama_url: str = "http://localhost:11434") -> str:
-    """Send prompt to Ollama and get response."""
+def read_streamed_response(response: requests.Response) -> str:
+    """Accumulate a streamed Ollama response, stopping once the candidates JSON is complete.
+    
+    Each streamed line is a JSON event carrying the next piece of generated text.
+    As soon as a complete object with a 'candidates' field has been received the
+    caller can close the connection, which stops Ollama from decoding any trailing text.
+    """
+    scanner = JsonScanner('{')
+    parts = []
+    
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json_loads(line)
+        if 'error' in event:
+            return f"Error querying Ollama: {event['error']}"
+        
+        chunk = event.get('response', '')
+        parts.append(chunk)
+        if any(is_candidates_object(obj) for obj in scanner.feed(chunk)):
+            break
+        if event.get('done'):
+            break
+    
+    return ''.join(parts)
+
+
+def query_ollama(prompt: str, model: str = "gpt-oss:20b", ollama_url: str = "http://localhost:11434",
+                 session: Optional[requests.Session] = None, stream: bool = True,
+                 structured: bool = True) -> str:
+    """Send prompt to Ollama and get response.
+    
+    With stream=True the response is read incrementally and the request is closed
+    as soon as the candidates JSON has been generated. With structured=True the
+    output is constrained to CANDIDATES_SCHEMA, so it comes back as bare JSON.
+    """
     url = f"{ollama_url}/api/generate"
     
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False
+        "stream": stream,
+        "keep_alive": OLLAMA_KEEP_ALIVE
     }
+    if structured:
+        payload["format"] = CANDIDATES_SCHEMA
     
     print(f"Sending request to Ollama (model: {model})...")
     print("This may take a while...\n")
     
+    http = session if session is not None else OLLAMA_SESSION
     try:
-        response = requests.post(url, json=payload, timeout=600)  # 10 minute timeout for large models
+        if stream:
+            # Leaving the with-block closes the connection, aborting any remaining generation
+            with http.post(url, json=payload, timeout=OLLAMA_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                return read_streamed_response(response)
+        
+        response = http.post(url, json=payload, timeout=OLLAMA_TIMEOUT)
         response.raise_for_status()
         
         result = response.json()
@@ -240,6 +461,164 @@ def query_ollama(prompt: str, model: str = "gpt-oss:20b", ollama_url: str = "htt
         return f"Error querying Ollama: {e}"
 
 
+def query_ollama_batch(prompts: List[str], model: str = "gpt-oss:20b",
+                       ollama_url: str = "http://localhost:11434", stream: bool = True,
+                       structured: bool = True,
+                       max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> List[str]:
+    """Send several prompts to Ollama concurrently and return responses in prompt order.
+
+    Requests are issued in parallel over the shared connection pool so the Ollama
+    scheduler can batch them together instead of serving them one after another.
+    Prompts are submitted in sorted order so requests sharing a template prefix
+    reach the server back-to-back and hit its prompt cache. At most max_concurrency
+    requests are in flight at once; the rest queue client-side.
+    """
+    if len(prompts) == 1:
+        return [query_ollama(prompts[0], model=model, ollama_url=ollama_url, stream=stream, structured=structured)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+        order = sorted(range(len(prompts)), key=prompts.__getitem__)
+        futures = {
+            i: executor.submit(query_ollama, prompts[i], model, ollama_url, OLLAMA_SESSION, stream, structured)
+            for i in order
+        }
+        return [futures[i].result() for i in range(len(prompts))]
+
+
+def per_narrative_path(path: str, narrative_path: str, multiple: bool) -> str:
+    """Return a file path unique to one narrative when several are processed at once."""
+    if not multiple:
+        return path
+    target = Path(path)
+    return str(target.with_name(f"{target.stem}_{Path(narrative_path).stem}{target.suffix}"))
+
+
+def append_jsonl(records: List[Dict[str, Any]], output_path: str) -> None:
+    """Append records to a JSON Lines file with a single write, then clear the list."""
+    if not records:
+        return
+    if orjson is not None:
+        data = b"".join(orjson.dumps(record) + b"\n" for record in records)
+    else:
+        data = "".join(json.dumps(record) + "\n" for record in records).encode('utf-8')
+    
+    fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    records.clear()
+
+
+def handle_response(response: str, narrative: str, args: argparse.Namespace,
+                    output_filename: str, narrative_path: str = "",
+                    records: Optional[List[Dict[str, Any]]] = None) -> Optional[bool]:
+    """Display, validate and optionally save a single Ollama response.
+
+    If records is given, the result is appended to it for a batched JSON Lines
+    write instead of being saved to its own file.
+
+    Returns:
+        True/False for the validation result, or None if validation was skipped
+    """
+    # Display raw response
+    if not args.quiet:
+        print("\n" + "=" * 80)
+        print("RAW RESPONSE:")
+        print("=" * 80)
+        # Write the (possibly large) response in one call on the binary buffer
+        sys.stdout.flush()
+        sys.stdout.buffer.write(response.encode('utf-8') + b"\n\n")
+        sys.stdout.buffer.flush()
+
+    # Perform sanity check (unless skipped)
+    is_valid = None
+    parsed_json = None
+    errors = []
+
+    if not args.skip_validation:
+        print("=" * 80)
+        print("SANITY CHECK:")
+        print("=" * 80)
+        is_valid, parsed_json, errors = sanity_check_response(response, narrative)
+
+        if is_valid:
+            print("✓ All sanity checks passed!")
+            print()
+            print("Validated JSON structure:")
+            print(json_dumps(parsed_json))
+        else:
+            print("✗ Sanity check failed with the following errors:")
+            print()
+            for error in errors:
+                print(f"  • {error}")
+            print()
+            print("Raw response saved, but validation failed.")
+            print("The model may have hallucinated or made errors in the response.")
+
+        print()
+    else:
+        print("=" * 80)
+        print("SANITY CHECK: SKIPPED")
+        print("=" * 80)
+        print("(Use without --skip-validation to enable validation)")
+        print()
+
+        # Still try to extract and parse JSON even when validation is skipped
+        json_str = extract_json_from_response(response)
+        if json_str:
+            try:
+                parsed_json = json_loads(json_str)
+                print("JSON extracted from response (validation skipped)")
+                print(json_dumps(parsed_json))
+                print()
+            except json.JSONDecodeError:
+                print("Warning: Could not parse JSON from response", file=sys.stderr)
+                print()
+
+    # Save response if requested
+    if args.output:
+        # If no parsed JSON, try to extract JSON from response
+        if parsed_json is None:
+            json_str = extract_json_from_response(response)
+            if json_str:
+                try:
+                    parsed_json = json_loads(json_str)
+                except json.JSONDecodeError:
+                    print("Warning: Could not parse JSON from response, saving raw response", file=sys.stderr)
+            else:
+                print("Warning: Could not extract JSON from response, saving raw response", file=sys.stderr)
+
+        if records is not None:
+            record = {"narrative": narrative_path, "valid": is_valid}
+            if parsed_json is not None:
+                record["clues"] = parsed_json
+            else:
+                record["raw_response"] = response
+            records.append(record)
+            return is_valid
+
+        # Create output directory if it doesn't exist
+        os.makedirs(args.output, exist_ok=True)
+
+        # Save generated clues JSON
+        output_path = os.path.join(args.output, output_filename)
+
+        # Try to save parsed JSON if available (even if validation failed)
+        if parsed_json is not None:
+            save_json(parsed_json, output_path)
+            print(f"✓ Saved generated clues JSON to: {output_path}")
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(response)
+            print(f"✓ Saved raw response to: {output_path}")
+        print()
+
+    return is_valid
+
+
 def main():
     """Main function."""
     parser = argparse.ArgumentParser(
@@ -250,12 +629,14 @@ Examples:
   python create_contextual_seed_word.py narrative.txt
   python create_contextual_seed_word.py narrative.txt --template custom_template.txt
   python create_contextual_seed_word.py narrative.txt --output result.txt --dry-run
+  python create_contextual_seed_word.py day1.txt day2.txt day3.txt --output out_dir
         """
     )
     parser.add_argument(
         'narrative',
         type=str,
-        help='Path to diary narrative txt file'
+        nargs='+',
+        help='Path(s) to diary narrative txt file(s); multiple narratives are sent to Ollama concurrently'
     )
     parser.add_argument(
         '--template', '-t',
@@ -279,7 +660,7 @@ Examples:
         '--output', '-o',
         type=str,
         default=None,
-        help='Output directory path to save the generated clues JSON (default: print to stdout). File will be saved as generated_contextual_clues_YYYY-MM-DD-HH-MM.json'
+        help='Output directory path to save the generated clues JSON (default: print to stdout). File will be saved as generated_contextual_clues_YYYY-MM-DD-HH-MM.json, or as one .jsonl file when several narratives are given'
     )
     parser.add_argument(
         '--save-prompt',
@@ -292,6 +673,27 @@ Examples:
         action='store_true',
         help='Only generate and save the merged prompt, do not call Ollama'
     )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=DEFAULT_MAX_CONCURRENCY,
+        help=f'Maximum number of narratives sent to Ollama at once (default: {DEFAULT_MAX_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--no-stream',
+        action='store_true',
+        help='Wait for the full response instead of streaming it and stopping once the JSON is complete'
+    )
+    parser.add_argument(
+        '--no-format',
+        action='store_true',
+        help='Do not constrain the model output to the candidates JSON schema'
+    )
+    parser.add_argument(
+        '--quiet', '-q',
+        action='store_true',
+        help='Do not print the merged prompt preview or the raw model response'
+    )
     parser.add_argument(
         '--skip-validation',
         action='store_true',
@@ -305,39 +707,52 @@ Examples:
     print("=" * 80)
     print()
     
-    # Load template
-    print(f"Loading template from: {args.template}")
-    template = load_template(args.template)
-    print(f"✓ Template loaded ({len(template)} characters)")
+    narrative_paths = args.narrative
+    multiple = len(narrative_paths) > 1
     
-    # Load diary narrative
-    print(f"Loading diary narrative from: {args.narrative}")
-    narrative = load_diary_narrative(args.narrative)
-    print(f"✓ Narrative loaded ({len(narrative)} characters)")
+    # Load template and diary narratives concurrently
+    with ThreadPoolExecutor(max_workers=len(narrative_paths) + 1) as executor:
+        template_future = executor.submit(load_template, args.template)
+        narrative_futures = [executor.submit(load_diary_narrative, path) for path in narrative_paths]
+        
+        print(f"Loading template from: {args.template}")
+        template = template_future.result()
+        print(f"✓ Template loaded ({len(template)} characters)")
+        
+        narratives = []
+        for narrative_path, narrative_future in zip(narrative_paths, narrative_futures):
+            print(f"Loading diary narrative from: {narrative_path}")
+            narrative = narrative_future.result()
+            print(f"✓ Narrative loaded ({len(narrative)} characters)")
+            narratives.append(narrative)
     print()
     
-    # Merge prompt
+    # Merge prompts
     print("Merging template with narrative...")
-    merged_prompt = merge_prompt(template, narrative)
-    print(f"✓ Merged prompt created ({len(merged_prompt)} characters)")
+    merged_prompts = [merge_prompt(template, narrative) for narrative in narratives]
+    for merged_prompt in merged_prompts:
+        print(f"✓ Merged prompt created ({len(merged_prompt)} characters)")
     print()
     
-    # Save merged prompt if requested
+    # Save merged prompts if requested
     if args.save_prompt:
-        with open(args.save_prompt, 'w', encoding='utf-8') as f:
-            f.write(merged_prompt)
-        print(f"✓ Saved merged prompt to: {args.save_prompt}")
+        for narrative_path, merged_prompt in zip(narrative_paths, merged_prompts):
+            prompt_path = per_narrative_path(args.save_prompt, narrative_path, multiple)
+            with open(prompt_path, 'w', encoding='utf-8') as f:
+                f.write(merged_prompt)
+            print(f"✓ Saved merged prompt to: {prompt_path}")
         print()
     
     # Show preview of the merged prompt
-    print("=" * 80)
-    print("MERGED PROMPT PREVIEW (first 500 chars):")
-    print("=" * 80)
-    print(merged_prompt[:500])
-    if len(merged_prompt) > 500:
-        print("...\n")
-    else:
-        print()
+    if not args.quiet:
+        print("=" * 80)
+        print("MERGED PROMPT PREVIEW (first 500 chars):")
+        print("=" * 80)
+        print(merged_prompts[0][:500])
+        if len(merged_prompts[0]) > 500:
+            print("...\n")
+        else:
+            print()
     
     if args.dry_run:
         print("=" * 80)
@@ -355,105 +770,51 @@ Examples:
     print("=" * 80)
     print(f"Model: {args.model}")
     print(f"URL: {args.ollama_url}")
+    print(f"Narratives: {len(merged_prompts)}")
     print()
     
-    response = query_ollama(merged_prompt, model=args.model, ollama_url=args.ollama_url)
+    responses = query_ollama_batch(merged_prompts, model=args.model, ollama_url=args.ollama_url,
+                                   stream=not args.no_stream, structured=not args.no_format,
+                                   max_concurrency=args.max_concurrency)
     
-    # Display raw response
-    print("\n" + "=" * 80)
-    print("RAW RESPONSE:")
-    print("=" * 80)
-    print(response)
-    print()
-    
-    # Perform sanity check (unless skipped)
-    is_valid = None
-    parsed_json = None
-    errors = []
-    
-    if not args.skip_validation:
-        print("=" * 80)
-        print("SANITY CHECK:")
-        print("=" * 80)
-        is_valid, parsed_json, errors = sanity_check_response(response, narrative)
-        
-        if is_valid:
-            print("✓ All sanity checks passed!")
-            print()
-            print("Validated JSON structure:")
-            print(json.dumps(parsed_json, indent=2))
-        else:
-            print("✗ Sanity check failed with the following errors:")
-            print()
-            for error in errors:
-                print(f"  • {error}")
-            print()
-            print("Raw response saved, but validation failed.")
-            print("The model may have hallucinated or made errors in the response.")
-        
-        print()
-    else:
-        print("=" * 80)
-        print("SANITY CHECK: SKIPPED")
-        print("=" * 80)
-        print("(Use without --skip-validation to enable validation)")
-        print()
-        
-        # Still try to extract and parse JSON even when validation is skipped
-        json_str = extract_json_from_response(response)
-        if json_str:
-            try:
-                parsed_json = json.loads(json_str)
-                print("JSON extracted from response (validation skipped)")
-                print(json.dumps(parsed_json, indent=2))
-                print()
-            except json.JSONDecodeError:
-                print("Warning: Could not parse JSON from response", file=sys.stderr)
-                print()
-    
-    # Save response if requested
-    import datetime
-    import os
-
     # Get current timestamp in YYYY-MM-DD-HH-MM format
     timestamp = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M")
-
-    if args.output:
-        # Create output directory if it doesn't exist
+    output_filename = f"generated_contextual_clues_{timestamp}.json"
+    
+    # With several narratives, results are collected and written once as JSON Lines.
+    # The atexit hook still writes what was collected if the run is interrupted.
+    records = None
+    if multiple and args.output:
         os.makedirs(args.output, exist_ok=True)
-        
-        # Save generated clues JSON
-        output_filename = f"generated_contextual_clues_{timestamp}.json"
-        output_path = os.path.join(args.output, output_filename)
-        
-        # Try to save parsed JSON if available (even if validation failed)
-        if parsed_json is not None:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(parsed_json, f, indent=2)
-            print(f"✓ Saved generated clues JSON to: {output_path}")
-        else:
-            # If no parsed JSON, try to extract JSON from response
-            json_str = extract_json_from_response(response)
-            if json_str:
-                try:
-                    extracted_json = json.loads(json_str)
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        json.dump(extracted_json, f, indent=2)
-                    print(f"✓ Saved generated clues JSON to: {output_path}")
-                except json.JSONDecodeError:
-                    print(f"Warning: Could not parse JSON from response, saving raw response to: {output_path}", file=sys.stderr)
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        f.write(response)
-            else:
-                print(f"Warning: Could not extract JSON from response, saving raw response to: {output_path}", file=sys.stderr)
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(response)
+        jsonl_path = os.path.join(args.output, f"generated_contextual_clues_{timestamp}.jsonl")
+        records = []
+        atexit.register(append_jsonl, records, jsonl_path)
+    
+    results = []
+    for narrative_path, narrative, response in zip(narrative_paths, narratives, responses):
+        if multiple:
+            print("\n" + "=" * 80)
+            print(f"NARRATIVE: {narrative_path}")
+            print("=" * 80)
+        results.append(handle_response(
+            response,
+            narrative,
+            args,
+            output_filename,
+            narrative_path=narrative_path,
+            records=records,
+        ))
+    
+    if records is not None:
+        count = len(records)
+        append_jsonl(records, jsonl_path)
+        print(f"✓ Saved {count} generated clue sets to: {jsonl_path}")
         print()
     
     print("=" * 80)
     if args.skip_validation:
         print("Done!")
-    elif is_valid:
+    elif all(results):
         print("Done! Response validated successfully.")
     else:
         print("Done! (with validation errors - review the output above)")
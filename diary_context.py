@@ -0,0 +1,254 @@
+"""
+Shared sensor loading, context tagging and timeline building for the diary context scripts
+(generate_contextual_diary_prompt_input.py and generate_diary_context.py).
+"""
+import numpy as np
+import pandas as pd
+import json
+import re
+from datetime import datetime
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
+# Sensor CSV times look like "02:25 PM"; timeline JSON times like "2024-01-03 14:25:00"
+SENSOR_TIME_FORMAT = "%I:%M %p"
+TIMELINE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Value columns get_context_tags reads from each sensor CSV (names after lowercasing/stripping);
+# sensors not listed here are read in full
+SENSOR_COLUMNS = {
+    'phone': ('in_use',),
+    'hr': ('heart_rate',),
+    'noise': ('ambient_noise',),
+    'uema': ('uema',),
+}
+
+# ==========================================
+# 1. DATA LOADING LOGIC
+# ==========================================
+def json_loads(data):
+    """
+    Parses JSON text or bytes, using orjson when it is available.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def load_sensor_data(filepath, day_label, target_date_str, quiet=False, columns=None):
+    """
+    Reads CSV, filters by day_label, and creates a timestamp column based on target_date_str.
+    With columns, only those value columns (plus day and time_only) are parsed from the CSV.
+    Read errors are reported unless quiet is set; either way an empty frame is returned.
+    """
+    try:
+        # Load CSV (skip bad lines for messy sensors like noise)
+        usecols = None
+        if columns is not None:
+            wanted = {'day', 'time_only', *columns}
+            usecols = lambda c: c.lower().strip() in wanted
+        df = pd.read_csv(filepath, on_bad_lines='skip', usecols=usecols)
+
+        # Normalize headers to lowercase and strip whitespace
+        df.columns = [c.lower().strip() for c in df.columns]
+
+        # 1. Filter by Day (if column exists)
+        if 'day' in df.columns:
+            df = df[df['day'] == day_label].copy()
+
+        # 2. Parse Time
+        # Expecting format like "02:25 PM"; the whole column is parsed at once and
+        # unparseable entries become NaT, which are dropped
+        if 'time_only' in df.columns:
+            base_date = pd.Timestamp(target_date_str)
+            times = pd.to_datetime(df['time_only'].astype(str).str.strip(), format=SENSOR_TIME_FORMAT, errors='coerce')
+            df['timestamp'] = base_date + (times - times.dt.normalize())
+            df = df.dropna(subset=['timestamp'])
+            # Sort once so every event window is a contiguous slice found by binary search
+            df = df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+        return df
+
+    except FileNotFoundError:
+        if not quiet:
+            print(f"Error: File not found: {filepath}")
+        return pd.DataFrame()
+    except Exception as e:
+        if not quiet:
+            print(f"Warning: Could not read {filepath}. Reason: {e}")
+        return pd.DataFrame()
+
+def to_sensor_arrays(df):
+    """
+    Converts a loaded sensor frame into the NumPy arrays get_context_tags reads, so the
+    per-event work is slicing and reducing arrays instead of pandas column operations.
+    """
+    if df.empty or 'timestamp' not in df.columns:
+        return {}
+    arrays = {'timestamp': df['timestamp'].to_numpy()}
+    if 'in_use' in df.columns:
+        arrays['is_active'] = (df['in_use'].astype(str).str.lower() == 'true').to_numpy()
+    if 'heart_rate' in df.columns:
+        arrays['heart_rate'] = pd.to_numeric(df['heart_rate'], errors='coerce').to_numpy(dtype=float)
+    if 'ambient_noise' in df.columns:
+        arrays['ambient_noise_lower'] = df['ambient_noise'].astype(str).str.lower().to_numpy()
+    if 'uema' in df.columns:
+        arrays['uema'] = df['uema'].to_numpy()
+    return arrays
+
+# ==========================================
+# 2. LOCATION NAMING
+# ==========================================
+def get_location_map(json_data):
+    """
+    Maps Cluster IDs to human-readable names ("Place Name (Neighborhood)") based on Nominatim data.
+    IDs are stored as strings, so they match whether the JSON gives them as ints or strings.
+    """
+    loc_map = {}
+    for cluster in json_data.get('clusters', []):
+        cid = cluster.get('cluster_id')
+        nom = cluster.get('nominatim', {})
+        addr = nom.get('address', {})
+
+        # Prioritize specific names over generic ones
+        primary = addr.get('amenity') or \
+                  addr.get('building') or \
+                  addr.get('shop') or \
+                  addr.get('office') or \
+                  addr.get('neighbourhood') or \
+                  "Unknown Location"
+
+        # Avoid repeating the primary name if it's the same
+        secondary = addr.get('suburb') or addr.get('city') or ""
+
+        if secondary and secondary != primary:
+            full_name = f"{primary} ({secondary})"
+        else:
+            full_name = primary
+
+        loc_map[str(cid)] = full_name
+    return loc_map
+
+def get_location_name(loc_map, cid):
+    """
+    Looks up a cluster's name, falling back to "Cluster <id>" for unknown clusters.
+    """
+    return loc_map.get(str(cid)) or f"Cluster {cid}"
+
+# ==========================================
+# 3. CONTEXT TAGGING LOGIC
+# ==========================================
+# Ambient noise keywords for each tag, matched against the lowercased labels in a window
+NOISE_TAG_KEYWORDS = {
+    "QUIET_ATMOSPHERE": ("silence",),
+    "SOCIAL_ATMOSPHERE": ("speech", "laughter", "voice", "crowd"),
+    "LOUD_ENVIRONMENT": ("traffic", "car", "outside", "siren"),
+    "AUDIBLE_MOVEMENT": ("walk", "footsteps"),
+}
+
+def compile_noise_patterns(tag_keywords):
+    """
+    Compiles each tag's keywords into one alternation, so a window is searched once per tag.
+    """
+    return [(tag, re.compile("|".join(map(re.escape, keywords)))) for tag, keywords in tag_keywords.items()]
+
+NOISE_TAG_PATTERNS = compile_noise_patterns(NOISE_TAG_KEYWORDS)
+
+def get_window(sensor, start, end):
+    """
+    Returns the (lo, hi) slice of a sensor's sorted timestamps with start <= timestamp <= end.
+    """
+    ts = sensor['timestamp']
+    return ts.searchsorted(np.datetime64(start), side='left'), ts.searchsorted(np.datetime64(end), side='right')
+
+def get_context_tags(start, end, sensor_dict, noise_patterns=NOISE_TAG_PATTERNS):
+    tags = set()
+
+    # --- Phone Usage ---
+    sensor = sensor_dict.get('phone')
+    if sensor:
+        lo, hi = get_window(sensor, start, end)
+        if hi > lo:
+            usage_ratio = sensor['is_active'][lo:hi].mean()
+            if usage_ratio > 0.4:
+                tags.add("HEAVY_PHONE_USE"); tags.add("DISTRACTED")
+            elif usage_ratio < 0.1:
+                tags.add("FOCUSED_OBSERVATION")
+
+    # --- Ambient Noise ---
+    sensor = sensor_dict.get('noise')
+    if sensor:
+        lo, hi = get_window(sensor, start, end)
+        if hi > lo:
+            labels = " ".join(sensor['ambient_noise_lower'][lo:hi])
+            for tag, pattern in noise_patterns:
+                if pattern.search(labels): tags.add(tag)
+
+    # --- Heart Rate ---
+    sensor = sensor_dict.get('hr')
+    if sensor:
+        lo, hi = get_window(sensor, start, end)
+        if hi > lo:
+            bpm = sensor['heart_rate'][lo:hi]
+            bpm = bpm[~np.isnan(bpm)]
+            avg_bpm = bpm.mean() if bpm.size else float('nan')
+            if avg_bpm > 105: tags.add("HIGH_EXERTION"); tags.add("RUSHED")
+            elif avg_bpm < 65: tags.add("RELAXED_STATE")
+
+    # --- uEMA Notes ---
+    sensor = sensor_dict.get('uema')
+    notes = []
+    if sensor:
+        lo, hi = get_window(sensor, start, end)
+        if hi > lo:
+            notes = pd.unique(sensor['uema'][lo:hi]).tolist()
+
+    return list(tags), notes
+
+# ==========================================
+# 4. TIMELINE & OUTPUT
+# ==========================================
+def build_timeline(timeline_data, loc_map):
+    """
+    Turns the visits (stays) and transitions (movements) in the timeline JSON into one
+    list of events sorted by start time.
+    """
+    full_timeline = []
+
+    # Process Visits
+    for v in timeline_data.get('visits', []):
+        full_timeline.append({
+            'type': 'STAY',
+            'start': datetime.strptime(v['start_time'], TIMELINE_TIME_FORMAT),
+            'end': datetime.strptime(v['end_time'], TIMELINE_TIME_FORMAT),
+            'location': get_location_name(loc_map, v['cluster_id']),
+            'pois': []
+        })
+
+    # Process Transitions
+    for t in timeline_data.get('transitions', []):
+        name_from = get_location_name(loc_map, t['from_cluster'])
+        name_to = get_location_name(loc_map, t['to_cluster'])
+
+        full_timeline.append({
+            'type': 'MOVEMENT',
+            'start': datetime.strptime(t['departure_time'], TIMELINE_TIME_FORMAT),
+            'end': datetime.strptime(t['arrival_time'], TIMELINE_TIME_FORMAT),
+            'location': f"{name_from} -> {name_to}",
+            'pois': [p['name'] for p in t.get('pois', [])]
+        })
+
+    full_timeline.sort(key=lambda x: x['start'])
+    return full_timeline
+
+def print_event(event, tags, notes):
+    print(f"<EVENT>")
+    print(f"  <TIME>{event['start'].strftime(SENSOR_TIME_FORMAT)} - {event['end'].strftime(SENSOR_TIME_FORMAT)}</TIME>")
+    print(f"  <TYPE>{event['type']}</TYPE>")
+    print(f"  <LOCATION>{event['location']}</LOCATION>")
+    print(f"  <CONTEXT_TAGS>{', '.join(tags)}</CONTEXT_TAGS>")
+    print(f"  <UEMA_NOTES>{' | '.join(notes)}</UEMA_NOTES>")
+    print(f"  <POIS>{', '.join(event['pois'])}</POIS>")
+    print(f"</EVENT>\n")
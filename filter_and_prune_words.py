@@ -2,24 +2,90 @@
 """
 Filter and prune words from a spelling bee puzzle JSON using LLM-based filtering.
 Processes words in batches and uses Ollama to filter inappropriate words.
+Batches are sent to Ollama concurrently so the server can work on several at once.
 """
 
 import json
 import argparse
+import functools
+import hashlib
 import re
 import requests
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+from llm_response import LLM_CACHE_DIR, JsonScanner, cache_get, cache_key, cache_put
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
 
 # Configuration
 MUST_INCLUDE_WORD_FREQUENCY_THRESHOLD = 5e-06
-BATCH_SIZE = 5
+BATCH_SIZE = 25  # Larger batches mean fewer LLM round trips, but longer prompts
+MAX_PROMPT_TOKENS = 4000  # Batches are split so the estimated prompt stays under this
 OLLAMA_URL = "http://localhost:11434"
 OLLAMA_MODEL = "gpt-oss:20b"
+# Keep/remove classification is a small task; a quantized instruct model is much faster
+MODEL_PRESETS = {
+    "fast": "llama3.1:8b-instruct-q4_K_M",
+    "accurate": OLLAMA_MODEL,
+}
 TIMEOUT = 300  # 5 minutes timeout
+OLLAMA_KEEP_ALIVE = "30m"  # Keep the model and its prompt cache loaded between batches
+OLLAMA_OPTIONS = {"temperature": 0}  # Greedy decoding so the same batch gives the same answer
+PLACEHOLDER = "<<>>"
+# (suffix, minimum word length) pairs stripped to map a batch word's base form back to it.
+# The suffixes share no endings, so at most one applies to any word.
+BASE_FORM_SUFFIXES = (("ing", 3), ("ed", 2), ("er", 4), ("s", 3))
+
+# JSON schema passed as Ollama's "format" so the model can only emit the expected object
+PRUNE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keep": {"type": "array", "items": {"type": "string"}},
+        "remove": {"type": "array", "items": {"type": "string"}},
+        "explanations": {"type": "object", "additionalProperties": {"type": "string"}}
+    },
+    "required": ["keep", "remove"]
+}
+
+# Patterns for pulling JSON out of free-form model output
+JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+JSON_OBJECT_RE = re.compile(r'(\{.*\})', re.DOTALL)
+CONCURRENCY = 4  # Batches in flight at once; match the server's OLLAMA_NUM_PARALLEL
+
+
+def create_session(pool_connections: int = 1, pool_maxsize: int = 8) -> requests.Session:
+    """Create a requests session with a keep-alive connection pool for Ollama."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared session so every batch reuses the same TCP connections to Ollama
+OLLAMA_SESSION = create_session()
+
+
+def batch_cache_key(model: str, prompt_template: str, batch: List[Dict[str, Any]]) -> str:
+    """Build a cache key from the model, the prompt template, the output schema,
+    the sampling options and the batch's words.
+    
+    Words are sorted so the same set of (word, definition) pairs hits the cache
+    regardless of the order they were batched in.
+    """
+    template_hash = hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()
+    pairs = sorted((w["word"].lower(), w.get("definition") or "") for w in batch)
+    key_data = json.dumps([model, template_hash, PRUNE_SCHEMA, OLLAMA_OPTIONS, pairs], ensure_ascii=False, sort_keys=True)
+    return cache_key(key_data)
 
 
 def load_prompt_template(prompt_path: str) -> str:
@@ -35,66 +101,206 @@ def load_prompt_template(prompt_path: str) -> str:
         sys.exit(1)
 
 
+@functools.lru_cache(maxsize=None)
+def prompt_line(word: str, definition: Optional[str]) -> str:
+    """Format a word and its definition as a "word: definition" prompt line, cached across batches and retries."""
+    return f"{word}: {definition or 'No definition available'}"
+
+
+def format_prompt_line(word_obj: Dict[str, Any]) -> str:
+    """Format one word object as a "word: definition" prompt line."""
+    return prompt_line(word_obj.get('word', ''), word_obj.get('definition'))
+
+
 def format_words_for_prompt(words: List[Dict[str, Any]]) -> str:
     """Format a list of word objects into the prompt format.
     
     Includes both word and definition for each word to help the LLM make decisions.
     """
-    lines = []
+    return "\n".join(format_prompt_line(word_obj) for word_obj in words)
+
+
+def placeholder_at_end(template: str) -> bool:
+    """Return True if the words placeholder is missing or is the last thing in the template."""
+    return PLACEHOLDER not in template or template.rstrip().endswith(PLACEHOLDER)
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of text (about 4 characters per token)."""
+    return len(text) // 4
+
+
+def build_batches(
+    words: List[Dict[str, Any]],
+    prompt_template: str,
+    batch_size: int,
+    max_prompt_tokens: int
+) -> List[List[Dict[str, Any]]]:
+    """Group words into batches of at most batch_size words.
+    
+    A batch is closed early when adding the next word would push the estimated
+    prompt size over max_prompt_tokens. A single word that is over the budget
+    on its own still gets a batch of its own.
+    """
+    template_tokens = estimate_tokens(prompt_template)
+    batches = []
+    batch = []
+    batch_tokens = template_tokens
+    
     for word_obj in words:
-        word = word_obj.get("word", "")
-        definition = word_obj.get("definition", "")
-        
-        # Warn if definition is missing
-        if not definition:
-            definition = "No definition available"
-            print(f"    Warning: Word '{word}' has no definition in input JSON")
-        
-        lines.append(f"{word}: {definition}")
-    return "\n".join(lines)
+        line = format_prompt_line(word_obj)
+        line_tokens = estimate_tokens(line + "\n")
+        if batch and (len(batch) >= batch_size or batch_tokens + line_tokens > max_prompt_tokens):
+            batches.append(batch)
+            batch = []
+            batch_tokens = template_tokens
+        batch.append(word_obj)
+        batch_tokens += line_tokens
+    
+    if batch:
+        batches.append(batch)
+    return batches
 
 
 def merge_prompt_with_words(template: str, words_text: str) -> str:
-    """Merge the prompt template with the words list."""
+    """Merge the prompt template with the words list.
+    
+    The placeholder should be at the end of the template so the words come last:
+    every batch then shares the instructions as an identical prompt prefix, which
+    Ollama can reuse from its cache instead of re-processing it.
+    """
     # Look for placeholder <<>>
-    if "<<>>" in template:
-        return template.replace("<<>>", words_text)
+    if PLACEHOLDER in template:
+        return template.replace(PLACEHOLDER, words_text)
     else:
         # If no placeholder, append words at the end
         return template + "\n\n" + words_text
 
 
-def extract_json_from_response(response: str) -> Optional[str]:
-    """Extract JSON from response, handling markdown code blocks and extra text."""
+def json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def save_json(data: Any, output_path: str):
+    """Write data to a file as indented UTF-8 JSON, using orjson when it is available."""
+    if orjson is not None:
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def json_dumps_compact(data: Any) -> bytes:
+    """Serialize data as compact UTF-8 JSON bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def save_json_streamed(data: Dict[str, Any], output_path: str):
+    """Write a dict to a file as JSON, emitting list values one item per line.
+    
+    Each item is serialized and written on its own, so the whole document is never
+    held in memory as a second, serialized copy. Item objects are written compactly.
+    """
+    with open(output_path, 'wb') as f:
+        f.write(b"{")
+        for key_num, (key, value) in enumerate(data.items()):
+            f.write(b",\n  " if key_num else b"\n  ")
+            f.write(json_dumps_compact(key) + b": ")
+            if isinstance(value, list) and value:
+                f.write(b"[")
+                for item_num, item in enumerate(value):
+                    f.write(b",\n    " if item_num else b"\n    ")
+                    f.write(json_dumps_compact(item))
+                f.write(b"\n  ]")
+            else:
+                f.write(json_dumps_compact(value))
+        f.write(b"\n}\n" if data else b"}\n")
+
+
+def extract_json_from_response(response: str) -> Optional[Any]:
+    """Extract and parse JSON from response, handling markdown code blocks and extra text.
+    
+    Returns the parsed value, or None if no JSON object could be found. Raises
+    json.JSONDecodeError if the extracted text is not valid JSON.
+    """
+    # Fast path: the response is already a bare JSON object
+    stripped = response.strip()
+    try:
+        result = json_loads(stripped)
+        if isinstance(result, dict):
+            return result
+    except json.JSONDecodeError:
+        pass
+    
     # Try to find JSON in markdown code blocks
-    json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', response, re.DOTALL)
+    json_match = JSON_FENCE_RE.search(response)
     if json_match:
-        return json_match.group(1)
+        return json_loads(json_match.group(1))
     
     # Try to find JSON object directly
-    json_match = re.search(r'(\{.*\})', response, re.DOTALL)
+    json_match = JSON_OBJECT_RE.search(response)
     if json_match:
-        return json_match.group(1)
+        return json_loads(json_match.group(1))
     
     return None
 
 
+def read_streamed_response(response: requests.Response) -> str:
+    """Accumulate a streamed Ollama response, stopping once the first JSON object closes.
+    
+    Braces are counted outside of JSON strings, so the connection can be closed as
+    soon as the keep/remove object is complete instead of waiting for the model to
+    finish any trailing text.
+    """
+    scanner = JsonScanner('{')
+    parts = []
+    
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json_loads(line)
+        if 'error' in event:
+            raise RuntimeError(f"Error querying Ollama: {event['error']}")
+        
+        chunk = event.get('response', '')
+        parts.append(chunk)
+        if scanner.feed(chunk):
+            break
+        if event.get('done'):
+            break
+    
+    return ''.join(parts)
+
+
 def query_ollama(prompt: str, model: str = OLLAMA_MODEL, ollama_url: str = OLLAMA_URL) -> str:
-    """Send prompt to Ollama and get response."""
+    """Send prompt to Ollama and get response.
+    
+    The output is constrained to PRUNE_SCHEMA and decoded greedily, so the response
+    is a bare JSON object; extract_json_from_response remains as a fallback for
+    servers that ignore the format field. The response is streamed and the request
+    is closed as soon as that object is complete.
+    """
     url = f"{ollama_url}/api/generate"
     
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "format": PRUNE_SCHEMA,
+        "options": OLLAMA_OPTIONS
     }
     
     try:
-        response = requests.post(url, json=payload, timeout=TIMEOUT)
-        response.raise_for_status()
-        
-        result = response.json()
-        return result.get('response', '')
+        with OLLAMA_SESSION.post(url, json=payload, timeout=TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            return read_streamed_response(response)
     
     except requests.exceptions.ConnectionError:
         raise ConnectionError(f"Could not connect to Ollama at {ollama_url}. Make sure Ollama is running.")
@@ -104,11 +310,73 @@ def query_ollama(prompt: str, model: str = OLLAMA_MODEL, ollama_url: str = OLLAM
         raise RuntimeError(f"Error querying Ollama: {e}")
 
 
+def retry_in_halves(
+    batch: List[Dict[str, Any]],
+    prompt_template: str,
+    batch_num: int,
+    total_batches: int,
+    model: str,
+    ollama_url: str,
+    use_cache: bool
+) -> Tuple[List[str], Dict[str, str]]:
+    """Re-run a batch whose response could not be parsed as two smaller batches.
+    
+    A single word cannot be split further, so it is kept as a fallback.
+    """
+    if len(batch) <= 1:
+        print(f"    Keeping all words in batch as fallback")
+        return [w["word"] for w in batch], {}
+    
+    print(f"    Retrying batch {batch_num} as two smaller batches")
+    middle = len(batch) // 2
+    kept_words, removed_words = process_batch(
+        batch[:middle], prompt_template, batch_num, total_batches, model, ollama_url, use_cache
+    )
+    more_kept, more_removed = process_batch(
+        batch[middle:], prompt_template, batch_num, total_batches, model, ollama_url, use_cache
+    )
+    kept_words.extend(more_kept)
+    removed_words.update(more_removed)
+    return kept_words, removed_words
+
+
+def dedupe_key(word_obj: Dict[str, Any]) -> Tuple[str, str]:
+    """Key identifying a (word, definition) pair regardless of the word's case."""
+    return word_obj["word"].lower().strip(), (word_obj.get("definition") or "").strip()
+
+
+def build_word_lookup(batch: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Map each batch word's normalized form, and simple base forms of it, to its word object.
+    
+    Exact forms take precedence over base forms, so an LLM reply can be matched back with a
+    single dict lookup. For words ending in one of BASE_FORM_SUFFIXES the base form is also
+    mapped (e.g., "ferret" for "ferreting") - this is a simple heuristic.
+    """
+    lookup = {}
+    normalized = []
+    for word_obj in batch:
+        normalized_word = word_obj["word"].lower().strip()
+        normalized.append((normalized_word, word_obj))
+        lookup.setdefault(normalized_word, word_obj)
+    
+    for normalized_word, word_obj in normalized:
+        for suffix, min_length in BASE_FORM_SUFFIXES:
+            if len(normalized_word) >= min_length and normalized_word.endswith(suffix):
+                lookup.setdefault(normalized_word[:-len(suffix)], word_obj)
+                break
+    
+    return lookup
+
+
 def process_batch(
     batch: List[Dict[str, Any]],
     prompt_template: str,
     batch_num: int,
-    total_batches: int
+    total_batches: int,
+    model: str = OLLAMA_MODEL,
+    ollama_url: str = OLLAMA_URL,
+    use_cache: bool = False
 ) -> Tuple[List[str], Dict[str, str]]:
     """
     Process a batch of words through Ollama.
@@ -116,6 +384,9 @@ def process_batch(
     NOTE: The LLM returns only word strings (not definitions). The full word objects
     with definitions are matched back to these strings in the main function.
     
+    With use_cache, a response previously stored for the same model, template and
+    words is reused instead of querying Ollama; new parseable responses are stored.
+    
     Returns:
         Tuple of (kept_word_strings, removed_words_with_explanations)
         - kept_word_strings: List of word strings that should be kept
@@ -140,30 +411,40 @@ def process_batch(
     # The prompt template placeholder <<>> will be replaced with the formatted words and definitions
     full_prompt = merge_prompt_with_words(prompt_template, words_text)
     
-    # Query Ollama
-    try:
-        response = query_ollama(full_prompt)
-    except Exception as e:
-        print(f"    Error querying Ollama: {e}")
-        print(f"    Keeping all words in batch as fallback")
-        # On error, keep all words as fallback
-        return [w["word"] for w in batch], {}
-    
-    # Extract JSON from response
-    json_str = extract_json_from_response(response)
-    if json_str is None:
-        print(f"    Warning: Could not extract JSON from response")
-        print(f"    Keeping all words in batch as fallback")
-        return [w["word"] for w in batch], {}
+    # Check the response cache before querying Ollama
+    key = batch_cache_key(model, prompt_template, batch) if use_cache else None
+    response = cache_get(key) if key else None
+    cached = response is not None
+    if cached:
+        print(f"    Using cached response")
     
-    # Parse JSON
+    # Query Ollama
+    if not cached:
+        try:
+            response = query_ollama(full_prompt, model=model, ollama_url=ollama_url)
+        except Exception as e:
+            print(f"    Error querying Ollama: {e}")
+            print(f"    Keeping all words in batch as fallback")
+            # On error, keep all words as fallback
+            return [w["word"] for w in batch], {}
+    
+    # Extract and parse JSON from response
     try:
-        result = json.loads(json_str)
+        result = extract_json_from_response(response)
     except json.JSONDecodeError as e:
         print(f"    Warning: Invalid JSON in response: {e}")
         print(f"    Response preview: {response[:200]}...")
-        print(f"    Keeping all words in batch as fallback")
-        return [w["word"] for w in batch], {}
+        return retry_in_halves(batch, prompt_template, batch_num, total_batches, model, ollama_url, use_cache)
+    if result is None:
+        print(f"    Warning: Could not extract JSON from response")
+        return retry_in_halves(batch, prompt_template, batch_num, total_batches, model, ollama_url, use_cache)
+    if not isinstance(result, dict):
+        print(f"    Warning: Expected a JSON object, got {type(result).__name__}")
+        return retry_in_halves(batch, prompt_template, batch_num, total_batches, model, ollama_url, use_cache)
+    
+    # Only cache responses that parsed, so a bad response is retried next run
+    if key and not cached:
+        cache_put(key, response)
     
     # Extract keep and remove lists - normalize them (lowercase, strip whitespace)
     kept_words_raw = result.get("keep", [])
@@ -174,39 +455,10 @@ def process_batch(
     kept_words_normalized = [w.strip().lower() for w in kept_words_raw if w and isinstance(w, str)]
     removed_words_normalized = [w.strip().lower() for w in removed_words_raw if w and isinstance(w, str)]
     
-    # Create a case-insensitive mapping from normalized word -> original word object
+    # Case-insensitive lookup from normalized word (and its base forms) -> original word object
     # This handles cases where LLM returns "Fear" but original is "fear"
-    batch_word_map = {}
-    batch_words_set = set()
-    for word_obj in batch:
-        original_word = word_obj["word"]
-        normalized_word = original_word.lower().strip()
-        batch_words_set.add(original_word)
-        # Map normalized word to original word object
-        if normalized_word not in batch_word_map:
-            batch_word_map[normalized_word] = word_obj
-        # Also map original case (lowercased) for exact matches
-        batch_word_map[original_word.lower()] = word_obj
-        
-        # Handle common variations: if LLM returns a variation (e.g., "ferreting" for "ferret")
-        # Try to match base forms - this is a simple heuristic
-        # For words ending in -ing, -ed, -er, -s, try matching the base form
-        if normalized_word.endswith('ing'):
-            base = normalized_word[:-3]
-            if base not in batch_word_map:
-                batch_word_map[base] = word_obj
-        if normalized_word.endswith('ed'):
-            base = normalized_word[:-2]
-            if base not in batch_word_map:
-                batch_word_map[base] = word_obj
-        if normalized_word.endswith('er') and len(normalized_word) > 3:
-            base = normalized_word[:-2]
-            if base not in batch_word_map:
-                batch_word_map[base] = word_obj
-        if normalized_word.endswith('s') and len(normalized_word) > 2:
-            base = normalized_word[:-1]
-            if base not in batch_word_map:
-                batch_word_map[base] = word_obj
+    batch_word_map = build_word_lookup(batch)
+    batch_words_set = {word_obj["word"] for word_obj in batch}
     
     # Match normalized LLM responses back to original words
     matched_kept_words = []
@@ -215,49 +467,24 @@ def process_batch(
     unmatched_removed = []
     
     for normalized_word in kept_words_normalized:
-        # Try direct match first
-        if normalized_word in batch_word_map:
-            original_word = batch_word_map[normalized_word]["word"]
-            matched_kept_words.append(original_word)
+        word_obj = batch_word_map.get(normalized_word)
+        if word_obj is not None:
+            matched_kept_words.append(word_obj["word"])
         else:
-            # Try to match if LLM returned a phrase containing the word (e.g., "To fear" -> "fear")
-            # Check if any batch word is contained in the normalized response
-            matched = False
-            for batch_word in batch_words_set:
-                batch_word_lower = batch_word.lower()
-                # If LLM response contains the batch word, or batch word contains the response
-                if normalized_word in batch_word_lower or batch_word_lower in normalized_word:
-                    # Prefer exact substring match
-                    if normalized_word == batch_word_lower:
-                        matched_kept_words.append(batch_word)
-                        matched = True
-                        break
-            if not matched:
-                unmatched_kept.append(normalized_word)
+            unmatched_kept.append(normalized_word)
     
     for normalized_word in removed_words_normalized:
-        # Try direct match first
-        if normalized_word in batch_word_map:
-            original_word = batch_word_map[normalized_word]["word"]
+        word_obj = batch_word_map.get(normalized_word)
+        if word_obj is not None:
+            original_word = word_obj["word"]
             # Get explanation (try both normalized and original case)
             explanation = explanations.get(normalized_word) or explanations.get(original_word) or "No explanation provided"
             matched_removed_words[original_word] = explanation
         else:
-            # Try to match if LLM returned a phrase containing the word
-            matched = False
-            for batch_word in batch_words_set:
-                batch_word_lower = batch_word.lower()
-                if normalized_word == batch_word_lower or (normalized_word in batch_word_lower or batch_word_lower in normalized_word):
-                    if normalized_word == batch_word_lower:
-                        explanation = explanations.get(normalized_word) or explanations.get(batch_word) or "No explanation provided"
-                        matched_removed_words[batch_word] = explanation
-                        matched = True
-                        break
-            if not matched:
-                unmatched_removed.append(normalized_word)
-                # Still record it with explanation for logging (won't affect final output)
-                explanation = explanations.get(normalized_word) or "No explanation provided"
-                matched_removed_words[normalized_word] = explanation
+            unmatched_removed.append(normalized_word)
+            # Still record it with explanation for logging (won't affect final output)
+            explanation = explanations.get(normalized_word) or "No explanation provided"
+            matched_removed_words[normalized_word] = explanation
     
     # Validate that all words in batch are accounted for
     accounted_for = set(matched_kept_words) | set(matched_removed_words.keys())
@@ -316,13 +543,32 @@ def main():
         "--batch-size",
         type=int,
         default=BATCH_SIZE,
-        help=f"Number of words to process per batch (default: {BATCH_SIZE})"
+        help=f"Maximum number of words per batch (default: {BATCH_SIZE}). Larger batches mean fewer "
+             f"LLM calls but longer prompts; keep them within the model's context length"
+    )
+    parser.add_argument(
+        "--max-prompt-tokens",
+        type=int,
+        default=MAX_PROMPT_TOKENS,
+        help=f"Split batches so each prompt stays under roughly this many tokens (default: {MAX_PROMPT_TOKENS})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"Number of batches sent to Ollama concurrently (default: {CONCURRENCY})"
     )
     parser.add_argument(
         "--model",
         type=str,
-        default=OLLAMA_MODEL,
-        help=f"Ollama model to use (default: {OLLAMA_MODEL})"
+        default=None,
+        help=f"Ollama model to use; overrides --model-preset (default: {OLLAMA_MODEL})"
+    )
+    parser.add_argument(
+        "--model-preset",
+        choices=sorted(MODEL_PRESETS),
+        default=None,
+        help="Pick a known-good model: " + ", ".join(f"{k}={v}" for k, v in sorted(MODEL_PRESETS.items()))
     )
     parser.add_argument(
         "--ollama-url",
@@ -330,6 +576,12 @@ def main():
         default=OLLAMA_URL,
         help=f"Ollama API URL (default: {OLLAMA_URL})"
     )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"Reuse Ollama responses for batches seen before, stored in {LLM_CACHE_DIR}/ (default: enabled)"
+    )
     parser.add_argument(
         "--log-removed",
         type=str,
@@ -342,19 +594,28 @@ def main():
         default=None,
         help="Path to save whitelisted words separately (before LLM processing)"
     )
+    parser.add_argument(
+        "--stream-output",
+        action="store_true",
+        help="Write the output file one word per line instead of pretty-printing it in one go, "
+             "which keeps memory use flat for very large word lists"
+    )
     
     args = parser.parse_args()
+    if args.model is None:
+        args.model = MODEL_PRESETS.get(args.model_preset, OLLAMA_MODEL)
     
     print("=" * 80)
     print("Word Filtering and Pruning")
     print("=" * 80)
+    print(f"Model: {args.model}")
     print()
     
     # Load input JSON
     print(f"Loading puzzle JSON from: {args.input_file}")
     try:
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            puzzle_data = json.load(f)
+        with open(args.input_file, 'rb') as f:
+            puzzle_data = json_loads(f.read())
     except FileNotFoundError:
         print(f"Error: File not found: {args.input_file}", file=sys.stderr)
         sys.exit(1)
@@ -385,37 +646,30 @@ def main():
     print(f"✓ Loaded {len(words_list)} words")
     print()
     
-    # First, automatically remove words with frequency 0.0 (invalid/not in dictionary)
-    print("Filtering out words with frequency 0.0...")
-    words_with_frequency = []
+    # Split words in a single pass: frequency 0.0 (invalid/not in dictionary) are removed,
+    # frequency above the threshold are always included, the rest go to the LLM
+    print(f"Classifying words (frequency threshold: {args.frequency_threshold})...")
     zero_frequency_words = []
+    always_include = []
+    to_be_processed = []
+    threshold = args.frequency_threshold
     
     for word_obj in words_list:
         freq = word_obj.get("frequency", 0.0)
         if freq == 0.0:
             zero_frequency_words.append(word_obj["word"])
+        elif freq > threshold:
+            always_include.append(word_obj)
         else:
-            words_with_frequency.append(word_obj)
+            if not word_obj.get("definition"):
+                print(f"  Warning: Word '{word_obj['word']}' has no definition in input JSON")
+            to_be_processed.append(word_obj)
     
     if zero_frequency_words:
         print(f"✓ Removed {len(zero_frequency_words)} words with frequency 0.0")
         print(f"  Examples: {', '.join(zero_frequency_words[:10])}{'...' if len(zero_frequency_words) > 10 else ''}")
     else:
         print(f"✓ No words with frequency 0.0 found")
-    print()
-    
-    # Classify words by frequency threshold (only for words with frequency > 0.0)
-    print(f"Classifying words (frequency threshold: {args.frequency_threshold})...")
-    always_include = []
-    to_be_processed = []
-    
-    for word_obj in words_with_frequency:
-        freq = word_obj.get("frequency", 0.0)
-        if freq > args.frequency_threshold:
-            always_include.append(word_obj)
-        else:
-            to_be_processed.append(word_obj)
-    
     print(f"✓ {len(always_include)} words always included (frequency > threshold)")
     print(f"✓ {len(to_be_processed)} words to be processed by LLM")
     print()
@@ -436,8 +690,7 @@ def main():
                 "note": "Whitelisted words (frequency > threshold) - saved before LLM processing"
             }
         
-        with open(args.save_whitelisted, 'w', encoding='utf-8') as f:
-            json.dump(whitelisted_output, f, indent=2, ensure_ascii=False)
+        save_json(whitelisted_output, args.save_whitelisted)
         print(f"✓ Saved {len(always_include)} whitelisted words")
         print()
     
@@ -445,6 +698,9 @@ def main():
     print(f"Loading prompt template from: {args.prompt}")
     prompt_template = load_prompt_template(args.prompt)
     print(f"✓ Prompt template loaded ({len(prompt_template)} characters)")
+    if not placeholder_at_end(prompt_template):
+        print(f"  Warning: {PLACEHOLDER} is not at the end of the template; "
+              f"batches will share a shorter cached prompt prefix")
     print()
     
     # Process words in batches
@@ -453,27 +709,46 @@ def main():
         kept_words_list = []
         all_removed = {}
     else:
-        print(f"Processing {len(to_be_processed)} words in batches of {args.batch_size}...")
+        print(f"Processing {len(to_be_processed)} words in batches of up to {args.batch_size} "
+              f"(~{args.max_prompt_tokens} prompt tokens)...")
         print()
         
         all_kept_words = []
         all_removed = {}
         
-        total_batches = (len(to_be_processed) + args.batch_size - 1) // args.batch_size
+        # Send each (word, definition) pair to the LLM once; duplicates share its decision
+        unique_words = {}
+        for word_obj in to_be_processed:
+            unique_words.setdefault(dedupe_key(word_obj), word_obj)
+        unique_words = list(unique_words.values())
+        if len(unique_words) < len(to_be_processed):
+            print(f"  Skipping {len(to_be_processed) - len(unique_words)} duplicate word(s)")
+            print()
         
-        for i in range(0, len(to_be_processed), args.batch_size):
-            batch = to_be_processed[i:i + args.batch_size]
-            batch_num = (i // args.batch_size) + 1
-            
-            kept_words, removed_dict = process_batch(
-                batch,
-                prompt_template,
-                batch_num,
-                total_batches
-            )
+        batches = build_batches(unique_words, prompt_template, args.batch_size, args.max_prompt_tokens)
+        total_batches = len(batches)
+        
+        # Send batches concurrently and merge each result as soon as its batch finishes.
+        # Kept words are matched back in to_be_processed order and removed words are
+        # logged sorted, so completion order does not affect the output.
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            futures = []
+            for batch_num, batch in enumerate(batches, 1):
+                futures.append(executor.submit(
+                    process_batch,
+                    batch,
+                    prompt_template,
+                    batch_num,
+                    total_batches,
+                    args.model,
+                    args.ollama_url,
+                    args.cache
+                ))
             
-            all_kept_words.extend(kept_words)
-            all_removed.update(removed_dict)
+            for future in as_completed(futures):
+                kept_words, removed_dict = future.result()
+                all_kept_words.extend(kept_words)
+                all_removed.update(removed_dict)
         
         print()
         print(f"✓ Processed {total_batches} batch(es)")
@@ -485,18 +760,22 @@ def main():
         # NOTE: LLM returns word strings (now matched/normalized), so we match them 
         # back to original word objects to preserve definitions, frequency, and other metadata
         kept_words_set = set(all_kept_words)
-        kept_words_list = [w for w in to_be_processed if w["word"] in kept_words_set]
+        kept_unique = [w for w in unique_words if w["word"] in kept_words_set]
         
         # Verify that all kept words have their definitions preserved
-        if len(kept_words_list) != len(all_kept_words):
+        if len(kept_unique) != len(all_kept_words):
             print(f"  Warning: Mismatch in kept words count!")
-            print(f"    Expected: {len(all_kept_words)}, Found: {len(kept_words_list)}")
-            missing = kept_words_set - {w["word"] for w in kept_words_list}
+            print(f"    Expected: {len(all_kept_words)}, Found: {len(kept_unique)}")
+            missing = kept_words_set - {w["word"] for w in kept_unique}
             if missing:
                 print(f"    Missing word objects for: {sorted(missing)}")
                 print(f"    These words will not be included in final output")
         else:
-            print(f"  ✓ All {len(kept_words_list)} kept words matched and have definitions preserved")
+            print(f"  ✓ All {len(kept_unique)} kept words matched and have definitions preserved")
+        
+        # Fan the decisions back out to every occurrence of a kept pair
+        kept_keys = {dedupe_key(w) for w in kept_unique}
+        kept_words_list = [w for w in to_be_processed if dedupe_key(w) in kept_keys]
     
     # Combine always_include and kept words
     final_words = always_include + kept_words_list
@@ -555,8 +834,10 @@ def main():
     
     # Save output
     print(f"Saving filtered words to: {args.output_file}")
-    with open(args.output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    if args.stream_output:
+        save_json_streamed(output_data, args.output_file)
+    else:
+        save_json(output_data, args.output_file)
     print(f"✓ Saved {len(final_words)} words to output file")
     print()
     
@@ -10,18 +10,51 @@ Post-process validated contextual clues:
 
 import argparse
 import json
+import pickle
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
 
 
 def load_json(path: Path) -> Any:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_json_cached(path: Path) -> Any:
+    # Reuse a pickle sidecar (<name>.json.pkl) parsed from this file unless the JSON is newer
+    cache_path = path.with_suffix(path.suffix + ".pkl")
+    try:
+        if cache_path.stat().st_mtime >= path.stat().st_mtime:
+            return pickle.loads(cache_path.read_bytes())
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+    data = load_json(path)
+    try:
+        cache_path.write_bytes(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError:
+        pass  # Cache is best effort; a read-only directory just means no sidecar
+    return data
+
+
+def save_json(data: Any, path: Path) -> None:
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-def deduplicate_clues(clues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def build_contextual_map(clues: List[Dict[str, Any]], score_threshold: float) -> Dict[str, Tuple[str, float]]:
+    # First occurrence of each word wins, even if it is later dropped by score or empty clue
+    ctx_map: Dict[str, Tuple[str, float]] = {}
     seen = set()
-    unique = []
     for entry in clues:
         word = str(entry.get("word", "")).strip()
         if not word:
@@ -30,16 +63,6 @@ def deduplicate_clues(clues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         if key in seen:
             continue
         seen.add(key)
-        unique.append(entry)
-    return unique
-
-
-def build_contextual_map(clues: List[Dict[str, Any]], score_threshold: float) -> Dict[str, Dict[str, Any]]:
-    ctx_map: Dict[str, Dict[str, Any]] = {}
-    for entry in clues:
-        word = str(entry.get("word", "")).strip()
-        if not word:
-            continue
         score = entry.get("score", 0)
         try:
             score_value = float(score)
@@ -50,59 +73,39 @@ def build_contextual_map(clues: List[Dict[str, Any]], score_threshold: float) ->
         clue_text = str(entry.get("clue", "")).strip()
         if not clue_text:
             continue
-        ctx_map[word.lower()] = {
-            "contextual_clue": clue_text,
-            "score": score_value
-        }
+        ctx_map[key] = (clue_text, score_value)
     return ctx_map
 
 
-def deduplicate_generic_clues(generic_clues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    seen = set()
-    unique = []
+def build_generic_map(generic_clues: List[Dict[str, Any]]) -> Dict[str, str]:
+    g_map: Dict[str, str] = {}
     for entry in generic_clues:
         word = str(entry.get("word", "")).strip()
         clue = str(entry.get("clue", "")).strip()
         if not word or not clue:
             continue
-        key = word.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append({"word": word, "clue": clue})
-    return unique
-
-
-def build_generic_map(generic_clues: List[Dict[str, Any]]) -> Dict[str, str]:
-    g_map: Dict[str, str] = {}
-    for entry in generic_clues:
-        word = entry["word"].lower()
-        g_map[word] = entry["clue"]
+        g_map.setdefault(word.lower(), clue)
     return g_map
 
 
 def merge_words_with_clues(
     words: List[Dict[str, Any]],
-    ctx_map: Dict[str, Dict[str, Any]],
+    ctx_map: Dict[str, Tuple[str, float]],
     generic_map: Dict[str, str]
 ) -> List[Dict[str, Any]]:
-    merged = []
+    merged: List[Dict[str, Any]] = []
+    append = merged.append
+    missing = ("N/A", 0)
     for word_info in words:
         word = str(word_info.get("word", "")).strip()
         if not word:
             continue
 
         lower = word.lower()
-        contextual_data = ctx_map.get(lower)
-        if contextual_data:
-            contextual_clue = contextual_data["contextual_clue"]
-            score = contextual_data["score"]
-        else:
-            contextual_clue = "N/A"
-            score = 0
+        contextual_clue, score = ctx_map.get(lower, missing)
         generic_clue = generic_map.get(lower, "N/A")
 
-        merged.append({
+        append({
             "word": word,
             "contextual_clue": contextual_clue,
             "generic_clue": generic_clue,
@@ -119,6 +122,7 @@ def main() -> None:
     parser.add_argument("--generic-clues", required=True, help="Path to JSON with generic clues.")
     parser.add_argument("--output", required=True, help="Path to save the finalized merged JSON.")
     parser.add_argument("--score-threshold", type=float, default=4.0, help="Minimum score required to keep a contextual clue.")
+    parser.add_argument("--cache", action="store_true", help="Cache parsed input JSON in .pkl sidecar files for faster re-runs.")
     args = parser.parse_args()
 
     pruned_path = Path(args.pruned_words)
@@ -126,8 +130,9 @@ def main() -> None:
 
     generic_path = Path(args.generic_clues)
     output_path = Path(args.output)
+    load_input = load_json_cached if args.cache else load_json
 
-    pruned_data = load_json(pruned_path)
+    pruned_data = load_input(pruned_path)
     if isinstance(pruned_data, dict) and "words" in pruned_data:
         words = pruned_data["words"]
         metadata = {
@@ -147,18 +152,16 @@ def main() -> None:
     else:
         raise ValueError("Pruned words JSON must be a dict with a 'words' key or a list of word entries.")
 
-    validated_data = load_json(validated_path)
+    validated_data = load_input(validated_path)
     if not isinstance(validated_data, list):
         raise ValueError("Validated clues JSON must be a list.")
 
-    generic_data = load_json(generic_path)
+    generic_data = load_input(generic_path)
     if not isinstance(generic_data, list):
         raise ValueError("Generic clues JSON must be a list.")
 
-    unique_clues = deduplicate_clues(validated_data)
-    contextual_map = build_contextual_map(unique_clues, args.score_threshold)
-    unique_generic = deduplicate_generic_clues(generic_data)
-    generic_map = build_generic_map(unique_generic)
+    contextual_map = build_contextual_map(validated_data, args.score_threshold)
+    generic_map = build_generic_map(generic_data)
     merged_entries = merge_words_with_clues(words, contextual_map, generic_map)
 
     output_data = {
@@ -170,8 +173,7 @@ def main() -> None:
         "words": merged_entries
     }
 
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    save_json(output_data, output_path)
 
     print(f"Saved {len(merged_entries)} finalized entries to {output_path}")
 
@@ -3,6 +3,11 @@ import argparse
 import requests
 import json
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
 # ==========================================
 # 1. THE SYSTEM PROMPT (Template)
 # ==========================================
@@ -44,6 +49,15 @@ Write only the final diary entry. Do not write preamble. Start directly with the
 # ==========================================
 # 2. OLLAMA API HANDLER
 # ==========================================
+# Shared session so repeated generations reuse the keep-alive connection to Ollama
+OLLAMA_SESSION = requests.Session()
+
+def json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 def query_ollama(model, prompt, stream=True):
     url = "http://localhost:11434/api/generate"
     
@@ -54,18 +68,21 @@ def query_ollama(model, prompt, stream=True):
     }
     
     try:
-        response = requests.post(url, json=payload, stream=stream)
+        response = OLLAMA_SESSION.post(url, json=payload, stream=stream)
         response.raise_for_status()
         
         print(f"--- GENERATING DIARY ({model}) ---\n")
         
-        # Stream the output to console in real-time
+        # Stream the output to console in real-time; lines are parsed as bytes
+        # and the final "done" event ends the stream
         for line in response.iter_lines():
-            if line:
-                decoded_line = line.decode('utf-8')
-                json_line = json.loads(decoded_line)
-                if not json_line.get("done"):
-                    print(json_line.get("response", ""), end="", flush=True)
+            if not line:
+                continue
+            json_line = json_loads(line)
+            if json_line.get("done"):
+                break
+            sys.stdout.write(json_line.get("response", ""))
+            sys.stdout.flush()
         print("\n\n--- END OF ENTRY ---")
         
     except requests.exceptions.ConnectionError:
@@ -5,12 +5,45 @@ Takes a word list and generates smartwatch-friendly EMA questions with clues.
 """
 
 import json
+import os
+import random
 import requests
+from requests.adapters import HTTPAdapter
 import argparse
 import sys
 import re
+import time
 from typing import Dict, List, Any, Optional
-from pathlib import Path
+
+from llm_response import LLM_CACHE_DIR, JsonScanner, cache_get, cache_key, cache_put
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Large word files are then parsed whole like small ones
+    ijson = None
+
+# Pruned-words files larger than this are streamed with ijson (when installed);
+# below it a single json.load is faster
+STREAM_PARSE_MIN_BYTES = 4_000_000
+# Errors raised for malformed JSON by whichever parser reads the pruned-words file
+JSON_PARSE_ERRORS = (json.JSONDecodeError, ijson.JSONError) if ijson is not None else (json.JSONDecodeError,)
+
+
+# Transient Ollama failures are retried with random exponential backoff (seconds)
+RETRY_ATTEMPTS = 5
+RETRY_MIN_WAIT = 1
+RETRY_MAX_WAIT = 30
+
+# JSON array inside a markdown code block in the model output
+JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\[.*?\])', re.DOTALL)
+
+# Decodes the first complete JSON value at an offset and reports where it ends
+JSON_DECODER = json.JSONDecoder()
 
 
 def load_prompt_template(prompt_path: str) -> str:
@@ -43,12 +76,18 @@ def load_word_list(word_list_path: str) -> List[str]:
 def load_pruned_words_json(json_path: str) -> List[str]:
     """Load pruned words from JSON file and return list of word strings."""
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if ijson is not None and os.path.getsize(json_path) > STREAM_PARSE_MIN_BYTES:
+            # Stream only the entries of the words array instead of building the whole document
+            with open(json_path, 'rb') as f:
+                words_list = list(ijson.items(f, 'words.item'))
+            data = {"words": words_list} if words_list else {}
+        else:
+            with open(json_path, 'rb') as f:
+                data = json_loads(f.read())
     except FileNotFoundError:
         print(f"Error: JSON file not found: {json_path}", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError as e:
+    except JSON_PARSE_ERRORS as e:
         print(f"Error: Invalid JSON in file: {e}", file=sys.stderr)
         sys.exit(1)
     
@@ -81,32 +120,120 @@ def build_full_prompt(template: str, word_list: List[str]) -> str:
         return template + "\n\n" + word_list_text
 
 
+def create_session() -> requests.Session:
+    """Create a requests session with a keep-alive connection pool for Ollama."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared session so repeated queries reuse the same connection to Ollama
+OLLAMA_SESSION = create_session()
+
+
+def is_transient(error: Exception) -> bool:
+    """Return True for failures worth retrying: dropped connections, timeouts, 5xx responses and truncated bodies."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError, ValueError))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Random exponential backoff before the retry that follows the given (1-based) attempt."""
+    return random.uniform(RETRY_MIN_WAIT, min(RETRY_MAX_WAIT, RETRY_MIN_WAIT * 2 ** attempt))
+
+
+def is_json_list(json_str: str) -> bool:
+    """Return True if the string parses to a JSON array."""
+    try:
+        return isinstance(json_loads(json_str), list)
+    except ValueError:
+        return False
+
+
+def read_streamed_response(response: requests.Response) -> str:
+    """Accumulate a streamed Ollama response, stopping once the JSON array is complete.
+    
+    Each streamed line is a JSON event carrying the next piece of generated text.
+    As soon as a complete array has been received the caller can close the
+    connection, which stops Ollama from decoding any trailing text.
+    """
+    scanner = JsonScanner('[')
+    parts = []
+    
+    for line in response.iter_lines():
+        if not line:
+            continue
+        event = json_loads(line)
+        if 'error' in event:
+            raise RuntimeError(f"Error querying Ollama: {event['error']}")
+        
+        chunk = event.get('response', '')
+        parts.append(chunk)
+        if any(is_json_list(array) for array in scanner.feed(chunk)):
+            break
+        if event.get('done'):
+            break
+    
+    return ''.join(parts)
+
+
 def query_ollama(prompt: str, model: str = "gpt-oss:20b", ollama_url: str = "http://localhost:11434") -> str:
-    """Send prompt to Ollama and get response."""
+    """Send prompt to Ollama and get response.
+    
+    The response is streamed and the request is closed as soon as the JSON
+    array has been generated.
+    """
     url = f"{ollama_url}/api/generate"
     
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False
+        "stream": True
     }
     
     print(f"Sending request to Ollama ({model})...")
     print("This may take a while...\n")
     
-    try:
-        response = requests.post(url, json=payload, timeout=600)  # 10 minute timeout for large models
-        response.raise_for_status()
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        try:
+            # 10 minute timeout for large models; leaving the with-block closes the
+            # connection, aborting any remaining generation
+            with OLLAMA_SESSION.post(url, json=payload, timeout=600, stream=True) as response:
+                response.raise_for_status()
+                return read_streamed_response(response)
         
-        result = response.json()
-        return result.get('response', '')
-    
-    except requests.exceptions.ConnectionError:
-        raise ConnectionError(f"Could not connect to Ollama at {ollama_url}. Make sure Ollama is running.")
-    except requests.exceptions.Timeout:
-        raise TimeoutError(f"Request to Ollama timed out after 600 seconds.")
-    except requests.exceptions.RequestException as e:
-        raise RuntimeError(f"Error querying Ollama: {e}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if attempt < RETRY_ATTEMPTS and is_transient(e):
+                delay = backoff_delay(attempt)
+                print(f"Warning: Ollama request failed ({e}); retry {attempt}/{RETRY_ATTEMPTS - 1} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            if isinstance(e, requests.exceptions.ConnectionError):
+                raise ConnectionError(f"Could not connect to Ollama at {ollama_url}. Make sure Ollama is running.")
+            if isinstance(e, requests.exceptions.Timeout):
+                raise TimeoutError(f"Request to Ollama timed out after 600 seconds.")
+            raise RuntimeError(f"Error querying Ollama: {e}")
+
+
+def json_loads(data):
+    """Parse JSON text or bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def save_json(data: Any, path: str) -> None:
+    """Write data as indented UTF-8 JSON, using orjson when it is available."""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
 
 
 def parse_json_response(response: str) -> Optional[List[Dict[str, Any]]]:
@@ -118,41 +245,35 @@ def parse_json_response(response: str) -> Optional[List[Dict[str, Any]]]:
         print("Warning: Empty response from LLM")
         return None
     
+    parsed = None
+    
     # Try to find JSON in markdown code blocks first
-    json_match = re.search(r'```(?:json)?\s*(\[.*?\])', response, re.DOTALL)
+    json_match = JSON_FENCE_RE.search(response)
     if json_match:
         json_str = json_match.group(1)
     else:
-        # Try to find JSON array directly - look for balanced brackets
+        # Try to find JSON array directly - decode the array that starts at the
+        # first bracket; the decoder stops at its matching closing bracket
         start_idx = response.find('[')
         if start_idx == -1:
             print("Warning: No opening bracket found in response")
             return None
         
-        # Find the matching closing bracket by counting brackets
-        bracket_count = 0
-        end_idx = start_idx
-        for i in range(start_idx, len(response)):
-            if response[i] == '[':
-                bracket_count += 1
-            elif response[i] == ']':
-                bracket_count -= 1
-                if bracket_count == 0:
-                    end_idx = i + 1
-                    break
-        
-        if bracket_count != 0:
-            print("Warning: Unbalanced brackets in JSON response")
+        try:
+            parsed, end_idx = JSON_DECODER.raw_decode(response, start_idx)
+            json_str = response[start_idx:end_idx]
+        except json.JSONDecodeError:
+            print("Warning: No complete JSON array after the first bracket")
             # Fallback to last closing bracket
             end_idx = response.rfind(']') + 1
             if end_idx == 0:
                 print("Warning: No closing bracket found")
                 return None
-        
-        json_str = response[start_idx:end_idx]
+            json_str = response[start_idx:end_idx]
     
     try:
-        parsed = json.loads(json_str)
+        if parsed is None:
+            parsed = json_loads(json_str)
         # Validate structure
         if not isinstance(parsed, list):
             print("Warning: JSON root is not an array")
@@ -184,12 +305,17 @@ def parse_json_response(response: str) -> Optional[List[Dict[str, Any]]]:
 
 
 def validate_output(output: List[Dict[str, Any]], input_words: List[str]) -> Dict[str, Any]:
-    """Validate that the output contains all input words and is well-formed."""
+    """Validate that the output contains all input words and is well-formed.
+    
+    The usable and unusable entries are collected in the same pass, for display_results.
+    """
     validation_results = {
         'missing_words': [],
         'extra_words': [],
         'invalid_entries': [],
-        'usability_stats': {'usable': 0, 'unusable': 0}
+        'usability_stats': {'usable': 0, 'unusable': 0},
+        'usable_words': [],
+        'unusable_words': []
     }
     
     output_words = set()
@@ -199,6 +325,7 @@ def validate_output(output: List[Dict[str, Any]], input_words: List[str]) -> Dic
         
         usable = entry.get('usable', None)
         if usable is True:
+            validation_results['usable_words'].append(entry)
             validation_results['usability_stats']['usable'] += 1
             # Check required fields for usable words
             required_fields = ['construct', 'ema_question', 'options', 'generic_clue', 'response_clues']
@@ -209,6 +336,7 @@ def validate_output(output: List[Dict[str, Any]], input_words: List[str]) -> Dic
                     'issue': f"Missing required fields: {missing}"
                 })
         elif usable is False:
+            validation_results['unusable_words'].append(entry)
             validation_results['usability_stats']['unusable'] += 1
             # Check required field for unusable words
             if 'reason' not in entry:
@@ -235,8 +363,8 @@ def display_results(output: List[Dict[str, Any]], validation: Dict[str, Any]):
     print("GENERATED EMA QUESTIONS:")
     print("=" * 80)
     
-    usable_words = [w for w in output if w.get('usable') is True]
-    unusable_words = [w for w in output if w.get('usable') is False]
+    usable_words = validation['usable_words']
+    unusable_words = validation['unusable_words']
     
     print(f"\nTotal words processed: {len(output)}")
     print(f"  - Usable: {len(usable_words)}")
@@ -336,6 +464,17 @@ Examples:
         default=None,
         help='File to save the full prompt for inspection'
     )
+    parser.add_argument(
+        '--cache',
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get('LLM_CACHE_ENABLED', '1') != '0',
+        help=f'Reuse Ollama responses stored in {LLM_CACHE_DIR}/ (default: enabled; LLM_CACHE_ENABLED=0 disables)'
+    )
+    parser.add_argument(
+        '--force-refresh',
+        action='store_true',
+        help='Ignore the cached response but store the new one'
+    )
     parser.add_argument(
         '--dry-run',
         action='store_true',
@@ -418,11 +557,17 @@ Examples:
     print(f"URL: {args.ollama_url}")
     print()
     
-    try:
-        response = query_ollama(full_prompt, model=args.model, ollama_url=args.ollama_url)
-    except Exception as e:
-        print(f"\nError: {e}", file=sys.stderr)
-        sys.exit(1)
+    key = cache_key(args.model, full_prompt) if args.cache else None
+    response = cache_get(key) if key and not args.force_refresh else None
+    cached = response is not None
+    if cached:
+        print(f"✓ Using cached response from {LLM_CACHE_DIR}/")
+    else:
+        try:
+            response = query_ollama(full_prompt, model=args.model, ollama_url=args.ollama_url)
+        except Exception as e:
+            print(f"\nError: {e}", file=sys.stderr)
+            sys.exit(1)
     
     # Parse JSON response
     print("\nParsing JSON response...")
@@ -439,6 +584,10 @@ Examples:
         print(f"\nRaw response saved to: {raw_file}")
         sys.exit(1)
     
+    # Only cache responses that parsed to entries, so a bad response is retried next run
+    if key and not cached and output:
+        cache_put(key, response)
+    
     # Validate output
     print("Validating output...")
     validation = validate_output(output, words)
@@ -450,8 +599,7 @@ Examples:
     
     # Save output
     print(f"Saving results to: {args.output}")
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    save_json(output, args.output)
     print(f"✓ Saved {len(output)} entries to '{args.output}'")
     print()
     
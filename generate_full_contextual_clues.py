@@ -1,12 +1,31 @@
 import sys
+import os
 import argparse
+import random
+import threading
+import time
 import requests
 import json
-import re
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llm_response import LLM_CACHE_DIR, JsonScanner, cache_get, cache_key, cache_prefix, cache_put
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Large word files are then parsed whole like small ones
+    ijson = None
 
 # ==========================================
 # CONTEXTUAL GENERATION PROMPT (v5)
 # ==========================================
+# Sent as Ollama's system prompt. With the diary filled in it is identical for every
+# batch, so Ollama can reuse its cached prefix and only process each batch's word list.
 CLUE_GENERATION_PROMPT = """
 ### CONTEXT
 You are a game engine generating puzzle clues from a user's diary.
@@ -17,7 +36,7 @@ The user must fill in the blank "_______" to guess the word.
 {DIARY_SUMMARY}
 
 **Word List:**
-{WORD_LIST}
+Given in the user message.
 
 ### INSTRUCTION
 Select all words that can *factually* describe the diary events.
@@ -56,17 +75,74 @@ Output ONLY a valid JSON list.
 ]
 """
 
+# Sent as the prompt for each batch
+WORD_LIST_PROMPT = """**Word List:**
+{WORD_LIST}"""
+WORD_LIST_PROMPT_PREFIX, WORD_LIST_PROMPT_SUFFIX = WORD_LIST_PROMPT.split("{WORD_LIST}")
+
+# JSON schema passed as Ollama's "format" so the model is constrained to emit a bare clue list
+CLUES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "word": {"type": "string"},
+            "clue": {"type": "string"},
+            "strategy": {"type": "string"},
+            "relevance_score": {"type": "integer"}
+        },
+        "required": ["word", "clue"]
+    }
+}
+
+OLLAMA_URL = "http://localhost:11434"
+MAX_CONTEXT = 4096  # Ollama's default context window (num_ctx), in tokens
+PROMPT_BUDGET = 0.8  # Share of the context window a batch's prompt may fill; the rest is left for the reply
+ENDPOINT_COOLDOWN = 30  # Seconds a failing Ollama server is skipped before it is tried again
+OLLAMA_KEEP_ALIVE = "30m"  # Keep the model and its cached system prompt loaded between batches
+DEFAULT_TEMPERATURE = 0.0  # Greedy decoding, so identical prompts give identical clues
+OLLAMA_SEED = 1  # Fixed sampling seed, so runs at a raised temperature are reproducible too
+OLLAMA_TIMEOUT = (10, 300)  # (connect, read) seconds: fail fast on a dead server, allow slow generation
+
+# Transient Ollama failures are retried with random exponential backoff (seconds)
+RETRY_ATTEMPTS = 5
+RETRY_MIN_WAIT = 1
+RETRY_MAX_WAIT = 30
+
+# Word files larger than this are streamed with ijson (when installed); below it a
+# single json.load is faster
+STREAM_PARSE_MIN_BYTES = 4_000_000
+
 def clean_diary_input(raw_text):
     """Removes logging headers."""
     lines = raw_text.splitlines()
     clean_lines = [l for l in lines if not l.startswith("---") and not l.startswith("Step")]
     return "\n".join(clean_lines).strip()
 
+def json_loads(data):
+    """Parses JSON text or bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def print_json(data):
+    """Prints data to stdout as indented JSON, using orjson when it is available."""
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(data, indent=2))
+
 def parse_word_list(json_file_path):
     """Extracts words from the Spelling Bee JSON."""
     try:
-        with open(json_file_path, 'r') as f:
-            data = json.load(f)
+        if ijson is not None and os.path.getsize(json_file_path) > STREAM_PARSE_MIN_BYTES:
+            # Stream just the word strings instead of building the whole document
+            with open(json_file_path, 'rb') as f:
+                return [word.upper() for word in ijson.items(f, 'words.item.word')]
+        with open(json_file_path, 'rb') as f:
+            data = json_loads(f.read())
         # Extract just the word strings
         valid_words = [item['word'].upper() for item in data.get('words', [])]
         return valid_words
@@ -75,52 +151,356 @@ def parse_word_list(json_file_path):
         return []
 
 def extract_json_from_text(text):
-    """Finds a JSON list [...] inside a larger string using Regex."""
+    """
+    Finds the first JSON list [...] inside a larger string, or returns "[]".
+    Uses a single linear bracket scan rather than a greedy DOTALL regex, which
+    backtracks badly on long responses and overshoots into trailing brackets.
+    """
+    # Fast path: structured output is already a bare JSON list
+    stripped = text.strip()
+    if stripped.startswith('[') and stripped.endswith(']'):
+        return stripped
+    for array in JsonScanner('[').feed(text):
+        if is_json_list(array):
+            return array
+    return "[]"
+
+def create_session(pool_connections=8, pool_maxsize=32):
+    """Creates a requests session with a keep-alive connection pool per Ollama server."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Shared by all batch workers so each request reuses an open connection to Ollama;
+# each server's pool keeps up to 32 of them alive, enough for any practical --concurrency
+OLLAMA_SESSION = create_session()
+
+def estimate_tokens(text):
+    """Roughly estimates the token count of text (about 4 characters per token)."""
+    return len(text) // 4
+
+class TokenBucket:
+    """Thread-safe token bucket holding up to capacity tokens, refilled at refill_per_sec."""
+
+    def __init__(self, capacity, refill_per_sec):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Blocks until the bucket holds enough tokens, then takes them."""
+        # A request larger than the bucket waits for a full bucket instead of forever
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.refill_per_sec
+            time.sleep(wait)
+
+class RateLimiter:
+    """Caps requests per minute and estimated prompt tokens per minute; either limit can be None."""
+
+    def __init__(self, rpm=None, tpm=None):
+        self.requests = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60) if tpm else None
+
+    def wait(self, *texts):
+        """Blocks until a request sending texts fits within both limits."""
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens:
+            self.tokens.acquire(sum(map(estimate_tokens, texts)))
+
+class EndpointPool:
+    """
+    Spreads requests over one or more Ollama servers. Each request goes to the healthy
+    server with the fewest requests in flight; a server that fails is skipped for cooldown seconds.
+    """
+
+    def __init__(self, urls, cooldown=ENDPOINT_COOLDOWN):
+        self.urls = urls
+        self.cooldown = cooldown
+        self.in_flight = {url: 0 for url in urls}
+        self.down_until = {url: 0.0 for url in urls}
+        self.lock = threading.Lock()
+
+    def healthy(self):
+        """Servers not cooling down after a failure; callers hold the lock."""
+        now = time.monotonic()
+        return [url for url in self.urls if self.down_until[url] <= now]
+
+    def acquire(self):
+        """Picks a server for one request; every acquire must be paired with a release."""
+        with self.lock:
+            # With every server cooling down, still send to the least loaded one
+            url = min(self.healthy() or self.urls, key=self.in_flight.__getitem__)
+            self.in_flight[url] += 1
+            return url
+
+    def release(self, url):
+        with self.lock:
+            self.in_flight[url] -= 1
+
+    def mark_failed(self, url):
+        with self.lock:
+            self.down_until[url] = time.monotonic() + self.cooldown
+
+    def any_healthy(self):
+        with self.lock:
+            return bool(self.healthy())
+
+def is_transient(error):
+    """True for failures worth retrying: dropped connections, timeouts, 5xx responses and truncated bodies."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError, ValueError))
+
+def backoff_delay(attempt):
+    """Random exponential backoff before the retry that follows the given (1-based) attempt."""
+    return random.uniform(RETRY_MIN_WAIT, min(RETRY_MAX_WAIT, RETRY_MIN_WAIT * 2 ** attempt))
+
+def is_json_list(text):
+    """True if text parses to a JSON list."""
     try:
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            return match.group(0)
-        return "[]"
-    except:
-        return "[]"
-
-def query_ollama(model, prompt):
-    url = "http://localhost:11434/api/generate"
+        return isinstance(json_loads(text), list)
+    except ValueError:
+        return False
+
+def read_streamed_response(resp):
+    """
+    Accumulates a streamed Ollama response, stopping once a complete JSON list has
+    been generated; the caller then closes the connection, so Ollama does not
+    decode any trailing chatter.
+    """
+    scanner = JsonScanner('[')
+    parts = []
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        event = json_loads(line)
+        if 'error' in event:
+            raise RuntimeError(event['error'])
+        chunk = event.get('response', '')
+        parts.append(chunk)
+        if any(is_json_list(array) for array in scanner.feed(chunk)):
+            break
+        if event.get('done'):
+            break
+    return ''.join(parts)
+
+def query_ollama(model, prompt, system=None, rate_limiter=None, endpoints=None, structured=True, options=None):
+    if endpoints is None:
+        endpoints = EndpointPool([OLLAMA_URL])
     
-    # NOTE: We removed "format": "json" to stop the model from choking.
-    # We will parse the text manually.
+    # NOTE: A bare "format": "json" made the model choke, so by default the output is
+    # constrained to CLUES_SCHEMA instead; with structured=False (or a server that
+    # ignores the format) the text is parsed manually.
     payload = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
-        "temperature": 0.7 
+        "system": system,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "stream": True
     }
+    if structured:
+        payload["format"] = CLUES_SCHEMA
+    if options:
+        payload["options"] = options
     
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        if rate_limiter:
+            rate_limiter.wait(system or "", prompt)
+        base_url = endpoints.acquire()
+        try:
+            # Leaving the with-block closes the connection, aborting any remaining generation
+            with OLLAMA_SESSION.post(f"{base_url}/api/generate", json=payload, stream=True,
+                                   timeout=OLLAMA_TIMEOUT) as resp:
+                resp.raise_for_status()
+                full_response = read_streamed_response(resp)
+            
+            # Debugging: Print raw response to stderr so you can see what's happening
+            # print(f"DEBUG RAW RESPONSE:\n{full_response}\n", file=sys.stderr)
+            
+            json_str = extract_json_from_text(full_response)
+            return json_str
+            
+        except Exception as e:
+            if attempt == RETRY_ATTEMPTS or not is_transient(e):
+                # Failures return an empty list, which process_batch never caches
+                print(f"Error calling Ollama: {e}", file=sys.stderr)
+                return "[]"
+            endpoints.mark_failed(base_url)
+            # Fail over to another server straight away; back off only when none is left
+            delay = 0 if endpoints.any_healthy() else backoff_delay(attempt)
+            print(f"Warning: Ollama call to {base_url} failed ({e}); retry {attempt}/{RETRY_ATTEMPTS - 1} in {delay:.1f}s",
+                  file=sys.stderr)
+            time.sleep(delay)
+        finally:
+            endpoints.release(base_url)
+
+def preload_model(model, base_url, options=None):
+    """
+    Loads the model on an Ollama server ahead of the first batch and keeps it loaded for
+    OLLAMA_KEEP_ALIVE. A request without a prompt only loads the model; it carries the
+    batches' options, since a different num_ctx would make Ollama load the model again.
+    Failures are left for the batch requests to report and retry.
+    """
+    payload = {"model": model, "keep_alive": OLLAMA_KEEP_ALIVE}
+    if options:
+        payload["options"] = options
     try:
-        resp = requests.post(url, json=payload)
+        resp = OLLAMA_SESSION.post(f"{base_url}/api/generate", json=payload, timeout=OLLAMA_TIMEOUT)
         resp.raise_for_status()
-        full_response = resp.json()['response']
-        
-        # Debugging: Print raw response to stderr so you can see what's happening
-        # print(f"DEBUG RAW RESPONSE:\n{full_response}\n", file=sys.stderr)
-        
-        json_str = extract_json_from_text(full_response)
-        return json_str
-        
-    except Exception as e:
-        print(f"Error calling Ollama: {e}", file=sys.stderr)
-        return "[]"
+    except requests.exceptions.RequestException as e:
+        print(f"Warning: Could not preload {model} on {base_url}: {e}", file=sys.stderr)
+
+def batch_cache_prefix(model, system_prompt, structured=True, options=None):
+    """
+    Hash state for the model, output format (CLUES_SCHEMA or none), Ollama options and
+    system prompt. It is computed once and copied for each batch, so the long diary
+    prompt is not re-hashed for every cache key.
+    """
+    settings = json.dumps([model, CLUES_SCHEMA if structured else None, options or {}], sort_keys=True)
+    return cache_prefix(settings, system_prompt)
+
+def load_checkpoint(checkpoint_path, run_digest):
+    """
+    Reads finished batches from a checkpoint JSONL file as {batch_num: (words, clues)}.
+    Only records written with the same run_digest (model, output format, options and
+    diary prompt) are read. A missing file means nothing is finished; a truncated last line from an
+    interrupted run is ignored.
+    """
+    finished = {}
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('run') != run_digest:
+                    continue
+                finished[record['batch']] = (record['words'], record['clues'])
+    except FileNotFoundError:
+        pass
+    return finished
+
+def open_checkpoint(checkpoint_path):
+    """Opens the checkpoint for appending, ending any truncated last line first."""
+    f = open(checkpoint_path, 'a+', encoding='utf-8')
+    if f.tell() > 0:
+        f.seek(f.tell() - 1)
+        if f.read(1) != '\n':
+            f.write('\n')
+    return f
 
-def batch_words(words, batch_size=5):
-    """Split words into batches of specified size."""
-    for i in range(0, len(words), batch_size):
-        yield words[i:i + batch_size]
+def write_checkpoint(f, run_digest, batch_num, word_batch, batch_clues):
+    """Appends one finished batch to the checkpoint file and flushes it to disk."""
+    f.write(json.dumps({'run': run_digest, 'batch': batch_num, 'words': word_batch, 'clues': batch_clues}) + '\n')
+    f.flush()
+    os.fsync(f.fileno())
+
+def batch_words(words, system_prompt, batch_size=5, max_context=MAX_CONTEXT):
+    """
+    Split words into batches of at most batch_size words. A batch is also closed early
+    when the next word would push the estimated prompt (system prompt, word list
+    template and words) past PROMPT_BUDGET of max_context; a batch always gets at
+    least one word.
+    """
+    budget = PROMPT_BUDGET * max_context
+    base_tokens = estimate_tokens(system_prompt) + estimate_tokens(WORD_LIST_PROMPT)
+    batches = []
+    batch = []
+    batch_tokens = base_tokens
+    for word in words:
+        word_tokens = estimate_tokens(word + ", ")
+        if batch and (len(batch) >= batch_size or batch_tokens + word_tokens > budget):
+            batches.append(batch)
+            batch = []
+            batch_tokens = base_tokens
+        batch.append(word)
+        batch_tokens += word_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+def batch_prompt(word_batch):
+    """The prompt sent for one batch of words."""
+    return f"{WORD_LIST_PROMPT_PREFIX}{', '.join(word_batch)}{WORD_LIST_PROMPT_SUFFIX}"
+
+def process_batch(model, system_prompt, word_batch, batch_num, total_batches, cache_prefix=None, refresh=False,
+                  rate_limiter=None, endpoints=None, structured=True, options=None):
+    """
+    Generates clues for one batch of words and returns them as a list.
+    With a cache_prefix, a stored response for the same model and prompts is reused
+    (unless refresh is set) and new responses that parse to clues are stored.
+    Requests to Ollama wait on rate_limiter when one is given and go to the servers in endpoints.
+    With structured, the model output is constrained to CLUES_SCHEMA; options are passed to Ollama as is.
+    """
+    print(f"Processing batch {batch_num}/{total_batches} ({len(word_batch)} words)", file=sys.stderr)
+    
+    final_prompt = batch_prompt(word_batch)
+    key = cache_key(final_prompt, prefix=cache_prefix) if cache_prefix else None
+    clues_json_str = cache_get(key) if key and not refresh else None
+    cached = clues_json_str is not None
+    if not cached:
+        clues_json_str = query_ollama(model, final_prompt, system=system_prompt, rate_limiter=rate_limiter,
+                                      endpoints=endpoints, structured=structured, options=options)
+    
+    # Parse the JSON response; only non-empty, well-formed clue lists are cached,
+    # so a failed or empty batch is asked again on the next run
+    try:
+        batch_clues = json.loads(clues_json_str)
+        if not isinstance(batch_clues, list):
+            print(f"Warning: Batch {batch_num} returned non-list result", file=sys.stderr)
+        elif not all(isinstance(item, dict) and isinstance(item.get('word'), str) and isinstance(item.get('clue'), str)
+                     for item in batch_clues):
+            print(f"Warning: Batch {batch_num} returned items without a word and clue", file=sys.stderr)
+        else:
+            if key and not cached and batch_clues:
+                cache_put(key, clues_json_str)
+            return batch_clues
+    except json.JSONDecodeError as e:
+        print(f"Warning: Failed to parse JSON from batch {batch_num}: {e}", file=sys.stderr)
+        print(f"Raw response: {clues_json_str[:200]}...", file=sys.stderr)
+    return []
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model', type=str, default='gpt-oss:20b')
     parser.add_argument('--words_file', type=str, required=True)
     parser.add_argument('--batch_size', type=int, default=5, help='Number of words to process per batch')
+    parser.add_argument('--max-context', type=int, default=None,
+                        help=f'Model context window in tokens, sent to Ollama as num_ctx; batches are cut so the '
+                             f'estimated prompt fits in {PROMPT_BUDGET:.0%} of it (default: the server\'s own setting, '
+                             f'budgeted as {MAX_CONTEXT})')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Number of batches sent to each Ollama server at once (match OLLAMA_NUM_PARALLEL)')
+    parser.add_argument('--ollama-urls', type=str, default=OLLAMA_URL,
+                        help=f'Comma-separated Ollama server URLs to spread batches over (default: {OLLAMA_URL})')
+    parser.add_argument('--rpm', type=float, default=None, help='Maximum requests per minute sent to Ollama (default: unlimited)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Maximum estimated prompt tokens per minute sent to Ollama (default: unlimited)')
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE,
+                        help='Sampling temperature; raise it for more varied clues (default: 0, deterministic)')
+    parser.add_argument('--cache', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('LLM_CACHE_ENABLED', '1') != '0',
+                        help=f'Reuse Ollama responses stored in {LLM_CACHE_DIR}/ (default: enabled; LLM_CACHE_ENABLED=0 disables)')
+    parser.add_argument('--force-refresh', action='store_true', help='Ignore cached responses but store the new ones')
+    parser.add_argument('--no-format', action='store_true',
+                        help='Do not constrain the model output to the clue list JSON schema')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='JSONL file recording finished batches; batches already in it are skipped on a rerun')
     parser.add_argument('input_diary', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
     args = parser.parse_args()
 
@@ -128,6 +508,11 @@ def main():
     raw_diary = args.input_diary.read()
     diary_text = clean_diary_input(raw_diary)
     word_list = parse_word_list(args.words_file)
+    # Repeated words would only be clued again; keep the first occurrence of each
+    unique_words = list(dict.fromkeys(word_list))
+    if len(unique_words) < len(word_list):
+        print(f"Skipping {len(word_list) - len(unique_words)} duplicate word(s)", file=sys.stderr)
+        word_list = unique_words
 
     if not diary_text or not word_list:
         print("Error: Missing diary text or word list.", file=sys.stderr)
@@ -135,31 +520,73 @@ def main():
 
     # 2. Generate clues in batches
     print(f"--- SELECTING & CLUING ({args.model}) ---", file=sys.stderr)
-    print(f"Processing {len(word_list)} words in batches of {args.batch_size}", file=sys.stderr)
     
-    all_clues = []
-    total_batches = (len(word_list) + args.batch_size - 1) // args.batch_size
+    # Built once so every batch sends a byte-identical system prompt
+    system_prompt = CLUE_GENERATION_PROMPT.replace("{DIARY_SUMMARY}", diary_text)
+    max_context = args.max_context or MAX_CONTEXT
+    if estimate_tokens(system_prompt) > PROMPT_BUDGET * max_context:
+        print(f"Warning: The diary prompt alone is ~{estimate_tokens(system_prompt)} tokens, over the "
+              f"prompt budget for a {max_context}-token context; sending one word per batch", file=sys.stderr)
+    batches = batch_words(word_list, system_prompt, args.batch_size, max_context)
+    options = {"temperature": args.temperature, "seed": OLLAMA_SEED}
+    # A context window that matches the budget keeps Ollama from truncating the start of the
+    # prompt, which would also throw away the diary prefix it reuses between batches
+    if args.max_context:
+        options["num_ctx"] = args.max_context
+    total_batches = len(batches)
+    print(f"Processing {len(word_list)} words in {total_batches} batches of up to {args.batch_size}", file=sys.stderr)
+    structured = not args.no_format
+    prefix = batch_cache_prefix(args.model, system_prompt, structured, options) if args.cache else None
+    rate_limiter = RateLimiter(args.rpm, args.tpm) if args.rpm or args.tpm else None
+    endpoints = EndpointPool([url.strip().rstrip('/') for url in args.ollama_urls.split(',') if url.strip()])
     
-    for batch_num, word_batch in enumerate(batch_words(word_list, args.batch_size), 1):
-        word_list_str = ", ".join(word_batch)
-        print(f"Processing batch {batch_num}/{total_batches} ({len(word_batch)} words)", file=sys.stderr)
-        
-        final_prompt = CLUE_GENERATION_PROMPT.replace("{DIARY_SUMMARY}", diary_text).replace("{WORD_LIST}", word_list_str)
-        clues_json_str = query_ollama(args.model, final_prompt)
-        
-        # Parse the JSON response and add to all_clues
-        try:
-            batch_clues = json.loads(clues_json_str)
-            if isinstance(batch_clues, list):
-                all_clues.extend(batch_clues)
-            else:
-                print(f"Warning: Batch {batch_num} returned non-list result", file=sys.stderr)
-        except json.JSONDecodeError as e:
-            print(f"Warning: Failed to parse JSON from batch {batch_num}: {e}", file=sys.stderr)
-            print(f"Raw response: {clues_json_str[:200]}...", file=sys.stderr)
+    # Batches recorded in the checkpoint are reused only if they come from the same model,
+    # settings and diary and hold the same words, so a changed input, word list or
+    # batch size cannot pick up another run's clues
+    run_digest = batch_cache_prefix(args.model, system_prompt, structured, options).hexdigest()
+    batch_results = {}
+    pending = {}
+    finished = load_checkpoint(args.checkpoint, run_digest) if args.checkpoint else {}
+    for batch_num, word_batch in enumerate(batches, 1):
+        if batch_num in finished and finished[batch_num][0] == word_batch:
+            batch_results[batch_num] = finished[batch_num][1]
+        else:
+            pending[batch_num] = word_batch
+    if batch_results:
+        print(f"Resuming from checkpoint: {len(batch_results)}/{total_batches} batches already done", file=sys.stderr)
+    
+    # Send batches concurrently; results are keyed by batch number so the
+    # combined output keeps word-list order whatever order batches finish in.
+    # Batches that produced clues are checkpointed as they finish; empty ones are retried next run
+    checkpoint_file = open_checkpoint(args.checkpoint) if args.checkpoint else None
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency) * len(endpoints.urls)) as executor:
+            # Load the model on every server at once, so batches do not each wait on a cold start;
+            # skipped when every pending batch will come from the cache
+            if any(not prefix or args.force_refresh or cache_get(cache_key(batch_prompt(word_batch), prefix=prefix)) is None
+                   for word_batch in pending.values()):
+                list(executor.map(lambda url: preload_model(args.model, url, options), endpoints.urls))
+            futures = {
+                executor.submit(process_batch, args.model, system_prompt, word_batch, batch_num, total_batches,
+                                prefix, args.force_refresh, rate_limiter, endpoints,
+                                structured, options): batch_num
+                for batch_num, word_batch in pending.items()
+            }
+            for future in as_completed(futures):
+                batch_num = futures[future]
+                batch_results[batch_num] = future.result()
+                if checkpoint_file and batch_results[batch_num]:
+                    write_checkpoint(checkpoint_file, run_digest, batch_num, pending[batch_num], batch_results[batch_num])
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+    
+    all_clues = []
+    for batch_num in sorted(batch_results):
+        all_clues.extend(batch_results[batch_num])
     
     # 3. Output combined results
-    print(json.dumps(all_clues, indent=2))
+    print_json(all_clues)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
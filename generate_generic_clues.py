@@ -1,22 +1,31 @@
 import sys
+import os
 import argparse
 import requests
 import json
 import re
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from llm_response import LLM_CACHE_DIR, cache_get, cache_key, cache_put, find_json_spans
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
 
 # ==========================================
 # GENERIC CLUE PROMPT
 # ==========================================
+# The word list comes last, so everything before it is identical for every batch
+# and Ollama can reuse its cached prefix instead of reprocessing the instructions
 GENERIC_PROMPT = """
 ### ROLE
 You are a Crossword Puzzle Constructor.
 Your task is to write **fun, easy-to-medium difficulty** clues for a list of words.
 
-### INPUT WORDS
-{WORD_LIST}
-
 ### INSTRUCTIONS
-For each word in the list, write one clue.
+For each word in the input list, write one clue.
 1. **Style:** Mix it up! Use definitions, synonyms, antonyms, or common phrases (fill-in-the-blank).
 2. **Difficulty:** Aim for "Monday Morning Crossword" difficulty. Accessible but clever.
 3. **Constraint:** Do NOT use the word itself (or variations of it) in the clue.
@@ -31,13 +40,47 @@ Output ONLY a JSON list of objects:
     "clue": "Your clue here."
   }
 ]
+
+### INPUT WORDS
+{WORD_LIST}
 """
 
+# The prompt around the word list, split once so each batch only joins its words in
+GENERIC_PROMPT_PREFIX, GENERIC_PROMPT_SUFFIX = GENERIC_PROMPT.split("{WORD_LIST}")
+
+# JSON schema passed as Ollama's "format" so the model is constrained to emit a bare clue list
+CLUES_SCHEMA = {
+    "type": "array",
+    "items": {
+        "type": "object",
+        "properties": {
+            "word": {"type": "string"},
+            "clue": {"type": "string"}
+        },
+        "required": ["word", "clue"]
+    }
+}
+
+def json_loads(data):
+    """Parses JSON text or bytes, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def print_json(data):
+    """Prints data to stdout as indented JSON, using orjson when it is available."""
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, option=orjson.OPT_INDENT_2) + b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(data, indent=2))
+
 def parse_game_json(file_path):
     """Extracts the list of words from your Spelling Bee JSON format."""
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
+        with open(file_path, 'rb') as f:
+            data = json_loads(f.read())
         # Extract just the word strings
         return [item['word'].upper() for item in data.get('words', [])]
     except Exception as e:
@@ -45,10 +88,17 @@ def parse_game_json(file_path):
         return []
 
 def extract_json_from_text(text):
-    """Robust JSON extraction using Regex."""
-    match = re.search(r'\[.*\]', text, re.DOTALL)
-    if match:
-        return match.group(0)
+    """Robust JSON extraction: the first [...] span in text that parses as a JSON list."""
+    # Fast path: structured output is already a bare JSON list
+    stripped = text.strip()
+    if stripped.startswith('[') and stripped.endswith(']'):
+        return stripped
+    for span in find_json_spans(text, '['):
+        try:
+            if isinstance(json_loads(span), list):
+                return span
+        except ValueError:
+            continue
     return None
 
 def check_spoiler(word, clue):
@@ -57,18 +107,57 @@ def check_spoiler(word, clue):
     clean_word = word.lower()
     return clean_word in clean_clue.split()
 
-def query_ollama(model, prompt):
-    url = "http://localhost:11434/api/generate"
+# (connect, read) timeouts in seconds: fail fast if Ollama is unreachable, but allow
+# up to 5 minutes between response bytes while a batch is generated
+OLLAMA_TIMEOUT = (10, 300)
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_KEEP_ALIVE = "30m"  # Keep the model loaded between batches and for reruns
+# Greedy decoding with a fixed seed by default, so the same prompt gives the same
+# clues and reruns can be served from the response cache
+DEFAULT_TEMPERATURE = 0.0
+OLLAMA_SEED = 1
+
+def create_session(pool_size=32):
+    """Creates a requests session whose keep-alive connection pool fits pool_size concurrent batches."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# Shared by all batch workers so each request reuses an open connection to Ollama;
+# the pool keeps up to 32 of them alive, enough for any practical --concurrency
+OLLAMA_SESSION = create_session()
+
+def preload_model(model):
+    """
+    Loads the model ahead of the first batch and keeps it loaded for OLLAMA_KEEP_ALIVE.
+    A request without a prompt only loads the model; failures are left for the batch
+    requests to report.
+    """
+    try:
+        resp = OLLAMA_SESSION.post(OLLAMA_URL, json={"model": model, "keep_alive": OLLAMA_KEEP_ALIVE},
+                                   timeout=OLLAMA_TIMEOUT)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"Warning: Could not preload {model}: {e}", file=sys.stderr)
+
+def query_ollama(model, prompt, structured=True, temperature=DEFAULT_TEMPERATURE):
+    url = OLLAMA_URL
     payload = {
         "model": model,
         "prompt": prompt,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "stream": False,
-        "temperature": 0.7 # Higher temp for creativity/variety
+        "options": {"temperature": temperature, "seed": OLLAMA_SEED}
     }
+    if structured:
+        payload["format"] = CLUES_SCHEMA
     try:
-        resp = requests.post(url, json=payload)
+        resp = OLLAMA_SESSION.post(url, json=payload, timeout=OLLAMA_TIMEOUT)
         resp.raise_for_status()
-        return resp.json()['response']
+        return json_loads(resp.content)['response']
     except Exception as e:
         print(f"Error calling Ollama: {e}", file=sys.stderr)
         return ""
@@ -77,11 +166,67 @@ def batch_process(word_list, batch_size=5):
     for i in range(0, len(word_list), batch_size):
         yield word_list[i:i + batch_size]
 
+def build_prompt(batch):
+    """Fills a batch of words into the generic clue prompt."""
+    # Format the list for the prompt
+    batch_str = json.dumps(batch)
+    return f"{GENERIC_PROMPT_PREFIX}{batch_str}{GENERIC_PROMPT_SUFFIX}"
+
+def process_batch(model, batch, structured=True, use_cache=False, refresh=False, temperature=DEFAULT_TEMPERATURE):
+    """
+    Generates clues for one batch of words, dropping any clue that spoils its word.
+    With structured, the model output is constrained to CLUES_SCHEMA. With use_cache,
+    a stored response for the same model, temperature and prompt is reused (unless
+    refresh is set) and new responses that parse to clues are stored.
+    """
+    final_prompt = build_prompt(batch)
+    key = cache_key(model, str(temperature), final_prompt) if use_cache else None
+    json_str = cache_get(key) if key and not refresh else None
+    cached = json_str is not None
+    
+    # Call LLM
+    if not cached:
+        raw_response = query_ollama(model, final_prompt, structured, temperature)
+        json_str = extract_json_from_text(raw_response)
+    
+    batch_clues = []
+    if json_str:
+        try:
+            data = json_loads(json_str)
+            if not isinstance(data, list) or not all(
+                    isinstance(item, dict) and isinstance(item.get('word'), str) and isinstance(item.get('clue'), str)
+                    for item in data):
+                raise ValueError("expected a list of objects with word and clue")
+            # Only non-empty, well-formed clue lists are cached, so a failed batch is asked again next run
+            if key and not cached and data:
+                cache_put(key, json_str)
+            # Post-Processing: Spoiler Check
+            for item in data:
+                if not check_spoiler(item['word'], item['clue']):
+                    batch_clues.append(item)
+                else:
+                    print(f"Skipped spoiler: {item['word']} -> {item['clue']}", file=sys.stderr)
+        except (ValueError, KeyError, TypeError):
+            print(f"Failed to parse batch: {batch}", file=sys.stderr)
+    else:
+        print(f"No JSON found for batch: {batch}", file=sys.stderr)
+    return batch_clues
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model', type=str, default='gemma3:27b')
     parser.add_argument('--words_file', type=str, required=True, help="Path to the Spelling Bee JSON file")
     parser.add_argument('--batch-size', type=int, default=5, help="Number of words per batch (default: 5)")
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help="Number of batches sent to Ollama at once (match OLLAMA_NUM_PARALLEL; default: 4)")
+    parser.add_argument('--no-format', action='store_true',
+                        help="Do not constrain the model output to the clue list JSON schema")
+    parser.add_argument('--temperature', type=float, default=DEFAULT_TEMPERATURE,
+                        help="Sampling temperature; raise it for more varied clues (default: 0, deterministic)")
+    parser.add_argument('--cache', action=argparse.BooleanOptionalAction,
+                        default=os.environ.get('LLM_CACHE_ENABLED', '1') != '0',
+                        help=f"Reuse Ollama responses stored in {LLM_CACHE_DIR}/ (default: enabled; LLM_CACHE_ENABLED=0 disables)")
+    parser.add_argument('--force-refresh', action='store_true', help="Ignore cached responses but store the new ones")
     args = parser.parse_args()
 
     # 1. Load Words
@@ -89,37 +234,39 @@ def main():
     if not all_words:
         print("No words found.", file=sys.stderr)
         return
+    # Repeated words would only be clued again; keep the first occurrence of each
+    unique_words = list(dict.fromkeys(all_words))
+    if len(unique_words) < len(all_words):
+        print(f"Skipping {len(all_words) - len(unique_words)} duplicate word(s)", file=sys.stderr)
+        all_words = unique_words
 
     final_clues = []
     
     print(f"--- GENERATING GENERIC CLUES ({len(all_words)} words) ---", file=sys.stderr)
 
     # 2. Process in Batches
-    for batch in batch_process(all_words, batch_size=args.batch_size):
-        # Format the list for the prompt
-        batch_str = json.dumps(batch)
-        final_prompt = GENERIC_PROMPT.replace("{WORD_LIST}", batch_str)
-        
-        # Call LLM
-        raw_response = query_ollama(args.model, final_prompt)
-        json_str = extract_json_from_text(raw_response)
-        
-        if json_str:
-            try:
-                data = json.loads(json_str)
-                # Post-Processing: Spoiler Check
-                for item in data:
-                    if not check_spoiler(item['word'], item['clue']):
-                        final_clues.append(item)
-                    else:
-                        print(f"Skipped spoiler: {item['word']} -> {item['clue']}", file=sys.stderr)
-            except:
-                print(f"Failed to parse batch: {batch}", file=sys.stderr)
-        else:
-            print(f"No JSON found for batch: {batch}", file=sys.stderr)
+    # Batches are sent concurrently; results are keyed by batch number so the
+    # output keeps word-list order whatever order batches finish in
+    batches = list(batch_process(all_words, batch_size=args.batch_size))
+    batch_results = {}
+    # Skip loading the model when every batch will come from the cache
+    if not args.cache or args.force_refresh or any(
+            cache_get(cache_key(args.model, str(args.temperature), build_prompt(batch))) is None for batch in batches):
+        preload_model(args.model)
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        futures = {
+            executor.submit(process_batch, args.model, batch, not args.no_format, args.cache,
+                            args.force_refresh, args.temperature): batch_num
+            for batch_num, batch in enumerate(batches)
+        }
+        for future in as_completed(futures):
+            batch_results[futures[future]] = future.result()
+
+    for batch_num in sorted(batch_results):
+        final_clues.extend(batch_results[batch_num])
 
     # 3. Output Final JSON
-    print(json.dumps(final_clues, indent=2))
+    print_json(final_clues)
 
 if __name__ == "__main__":
     main()
@@ -9,11 +9,18 @@ spelling bee helpers.
 """
 
 import json
+import math
 import random
 from pathlib import Path
 from typing import Iterable, List
 
-from wordfreq import word_frequency
+import numpy as np
+from wordfreq import get_frequency_dict, word_frequency
+
+try:
+    import ijson
+except ImportError:  # Large dictionaries are then parsed whole like small ones
+    ijson = None
 
 
 DICTIONARY_PATH = Path(
@@ -22,9 +29,27 @@ DICTIONARY_PATH = Path(
 FREQUENCY_THRESHOLD = 7e-6
 NUM_CANDIDATES = 10
 
+# Dictionaries larger than this are streamed with ijson (when installed), so their
+# definitions are never all held in memory; below it a single json.load is faster
+STREAM_PARSE_MIN_BYTES = 4_000_000
+
+# wordfreq's English table, loaded once so frequencies are plain dict lookups
+FREQUENCIES = get_frequency_dict("en")
+
+# Number of set bits in each byte value, for counting the letters in whole mask arrays
+# on NumPy versions without np.bitwise_count
+BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Mask bits above the 26 letters, set by characters that are not a-z/A-Z
+NON_LETTER_BIT = 1 << 26
+NON_ASCII_BIT = 1 << 27
+
 
 def load_words(path: Path) -> List[str]:
     """Return a flat list of words from a JSON list or dict."""
+    if ijson is not None and path.stat().st_size > STREAM_PARSE_MIN_BYTES:
+        return stream_words(path)
+
     with path.open("r", encoding="utf-8") as f:
         data = json.load(f)
 
@@ -36,6 +61,21 @@ def load_words(path: Path) -> List[str]:
     raise ValueError("Dictionary JSON must be either a list of words or a dict.")
 
 
+def stream_words(path: Path) -> List[str]:
+    """load_words for large files: stream just the top-level keys or items with ijson."""
+    with path.open("rb") as f:
+        events = ijson.parse(f)
+        _, event, _ = next(events)
+        if event == "start_map":
+            # Only the keys are kept; definition values are skipped as they stream past
+            return [str(value).strip() for prefix, event, value in events if event == "map_key" and not prefix]
+        if event == "start_array":
+            f.seek(0)
+            return [str(word).strip() for word in ijson.items(f, "item")]
+
+    raise ValueError("Dictionary JSON must be either a list of words or a dict.")
+
+
 def has_seven_distinct_letters(word: str) -> bool:
     """True if the word only has letters and exactly 7 unique ones."""
     lowered = word.lower()
@@ -44,15 +84,68 @@ def has_seven_distinct_letters(word: str) -> bool:
     return len(set(lowered)) == 7
 
 
+def english_frequency(word: str) -> float:
+    """Same value as word_frequency(word, "en"), without its per-call tokenizing.
+
+    A lowercase a-z word is its own single token, so its frequency is the table
+    entry rounded to 3 significant digits as wordfreq does; anything else goes
+    through word_frequency.
+    """
+    if not (word.isascii() and word.isalpha() and word.islower()):
+        return word_frequency(word, "en")
+    freq = FREQUENCIES.get(word, 0.0)
+    if freq == 0.0:
+        return 0.0
+    return round(freq, math.floor(-math.log(freq, 10)) + 3)
+
+
+def count_letters(masks: np.ndarray) -> np.ndarray:
+    """Return the number of letters (set bits) in each uint32 mask."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks)
+    return BYTE_POPCOUNT[masks.view(np.uint8)].reshape(-1, 4).sum(axis=1)
+
+
+def seven_distinct_letter_flags(words: List[str]) -> np.ndarray:
+    """Vectorized has_seven_distinct_letters: one bool per word.
+
+    All words are packed into one array of code points, and each word's characters
+    are OR-reduced into a mask whose set bits are then counted, instead of building
+    a set per word. Characters other than letters set a bit above the 26 letter
+    bits, so one reduction both builds the letter set and flags words that are not
+    all letters. Masks only cover a-z, so the rare words with non-ASCII characters
+    fall back to the per-word check.
+    """
+    flags = np.zeros(len(words), dtype=bool)
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    present = np.flatnonzero(lengths)
+    if present.size == 0:
+        return flags
+
+    chars = np.frombuffer("".join(words).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    # Setting bit 5 lowercases A-Z and moves no other character into a-z;
+    # subtracting 97 wraps everything outside a-z past 25
+    letter = (chars | 32) - 97
+    non_letter = np.where(chars > 127, np.uint32(NON_ASCII_BIT), np.uint32(NON_LETTER_BIT))
+    bits = np.where(letter < 26, np.left_shift(np.uint32(1), letter & 31), non_letter)
+
+    starts = (np.cumsum(lengths) - lengths)[present]
+    masks = np.bitwise_or.reduceat(bits, starts)
+    flags[present] = (masks < NON_LETTER_BIT) & (count_letters(masks) == 7)
+
+    for i in present[(masks & NON_ASCII_BIT) != 0]:
+        flags[i] = has_seven_distinct_letters(words[i])
+    return flags
+
+
 def filter_candidates(words: Iterable[str]) -> List[str]:
     """Filter to words that satisfy the letter and frequency constraints."""
+    words = list(words)
     candidates: List[str] = []
 
-    for word in words:
-        if not has_seven_distinct_letters(word):
-            continue
-
-        freq = word_frequency(word.lower(), "en")
+    for i in np.flatnonzero(seven_distinct_letter_flags(words)):
+        word = words[i]
+        freq = english_frequency(word.lower())
         if freq > FREQUENCY_THRESHOLD:
             candidates.append(word.lower())
 
@@ -72,7 +165,7 @@ def main() -> None:
 
     print(f"Random {NUM_CANDIDATES} candidates (freq > {FREQUENCY_THRESHOLD}):")
     for word in chosen:
-        freq = word_frequency(word, "en")
+        freq = english_frequency(word)
         print(f"- {word} (freq: {freq:.6f})")
 
     final_pick = random.choice(chosen)
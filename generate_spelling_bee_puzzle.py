@@ -7,13 +7,21 @@ and finds all valid words using functions from index_mask_dictionary.py
 
 import argparse
 import json
+import os
+import pickle
 import random
 import re
 import sys
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library json module
+    orjson = None
+
 # Add words_database directory to path to import index_mask_dictionary
 _words_db_path = Path(__file__).parent.parent / "words_database"
 if str(_words_db_path) not in sys.path:
@@ -24,8 +32,9 @@ try:
         load_words_from_json,
         build_mask_index,
         all_words_for_seed,
+        word_to_mask,
     )
-    from wordfreq import word_frequency
+    from generate_seven_letter_candidates import english_frequency
 except ImportError as e:
     print(f"Error importing required modules: {e}", file=sys.stderr)
     print(f"Tried to import from: {_words_db_path}", file=sys.stderr)
@@ -38,8 +47,9 @@ DICTIONARY_PATH = Path("/home/mhealth-admin/jin/words_with_friends/words_databas
 MIN_WORD_LENGTH = 4
 MIN_WORDS_REQUIRED = 20
 SUBSET_FREQ_THRESHOLD = 7e-6
+LETTER_RE = re.compile(r"[a-zA-Z]")
 OUTPUT_DIR = Path("/home/mhealth-admin/jin/words_with_friends/spelling_bee/generated_jsons")
-
+MASK_INDEX_CACHE_VERSION = 2  # Bump when the cached (key, mask_index) layout changes
 
 def load_candidate_words(json_path: str) -> Dict[str, Any]:
     """Load candidate words from JSON file."""
@@ -71,12 +81,34 @@ def parse_distinct_letters(distinct_letters: Any) -> List[str]:
     if isinstance(distinct_letters, list):
         letters = [str(letter).lower().strip() for letter in distinct_letters]
     elif isinstance(distinct_letters, str):
-        letters = [letter.lower() for letter in re.findall(r"[a-zA-Z]", distinct_letters)]
+        letters = [letter.lower() for letter in LETTER_RE.findall(distinct_letters)]
     else:
         letters = []
     return [letter for letter in letters if letter]
 
 
+def center_word_bounds(seed: str, mask_index: Dict[int, List[str]]) -> Dict[str, int]:
+    """
+    Upper bound on the number of words all_words_for_seed can return for each center
+    letter of seed: the indexed words whose letters are all in the seed and include
+    the center. One walk over the seed's letter subsets covers every center at once.
+    """
+    seed_mask = word_to_mask(seed)
+    letter_bits = {letter: word_to_mask(letter) for letter in seed}
+    letter_bits = {letter: bit for letter, bit in letter_bits.items() if bit}
+    bounds = dict.fromkeys(letter_bits, 0)
+
+    subset = seed_mask
+    while subset:
+        count = len(mask_index.get(subset, ()))
+        if count:
+            for letter, bit in letter_bits.items():
+                if subset & bit:
+                    bounds[letter] += count
+        subset = (subset - 1) & seed_mask
+    return bounds
+
+
 def evaluate_candidate(
     candidate: Dict[str, Any],
     mask_index: Dict[int, List[str]],
@@ -85,7 +117,8 @@ def evaluate_candidate(
 ) -> Optional[Tuple[Dict[str, Any], str, List[str]]]:
     """
     Try all center letters for a candidate and return the first combination
-    that meets the min_words_required threshold.
+    that meets the min_words_required threshold. Centers that cannot reach it
+    by center_word_bounds are skipped without listing their words.
     """
     word = str(candidate.get('word', '')).lower().strip()
     distinct_letters = parse_distinct_letters(candidate.get('distinct_letters', []))
@@ -100,8 +133,15 @@ def evaluate_candidate(
 
     centers = unique_letters.copy()
     random.shuffle(centers)
+    bounds = center_word_bounds(seed, mask_index)
 
     for center_letter in centers:
+        bound = bounds.get(center_letter)
+        if bound is not None and bound < min_words_required:
+            if verbose:
+                print(f"  Tried '{word}' with center '{center_letter}': at most {bound} words (need {min_words_required})")
+            continue
+
         try:
             valid_words = all_words_for_seed(
                 seed=seed,
@@ -147,14 +187,89 @@ def pick_candidate_and_center(
     return None
 
 
-def get_word_definition(word: str, dict_data: Dict[str, Any]) -> str:
-    """Get definition for a word from dictionary data."""
+def mask_index_cache_path(dict_path: Path) -> Path:
+    """Sidecar file holding the mask index built from a dictionary."""
+    return dict_path.with_name(dict_path.name + ".mask_index.pkl")
+
+
+def mask_index_cache_key(dict_path: Path) -> Tuple[Any, ...]:
+    """
+    Key a cached mask index must match to be reused: the cache format, the version of
+    index_mask_dictionary that built it, the dictionary file and MIN_WORD_LENGTH.
+    """
+    stat = dict_path.stat()
+    builder_file = getattr(sys.modules.get(build_mask_index.__module__), '__file__', None)
+    try:
+        builder_stat = os.stat(builder_file) if builder_file else None
+    except OSError:
+        builder_stat = None
+    builder_version = (builder_stat.st_mtime_ns, builder_stat.st_size) if builder_stat else None
+    return (MASK_INDEX_CACHE_VERSION, builder_version, stat.st_mtime_ns, stat.st_size, MIN_WORD_LENGTH)
+
+
+def load_cached_mask_index(dict_path: Path) -> Optional[Dict[int, List[str]]]:
+    """
+    Return the cached mask index for the dictionary, or None if there is no cache or
+    it was built with a different mask_index_cache_key.
+    """
+    try:
+        with open(mask_index_cache_path(dict_path), 'rb') as f:
+            key, mask_index = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return None
+    if key != mask_index_cache_key(dict_path):
+        return None
+    return mask_index
+
+
+def save_cached_mask_index(dict_path: Path, mask_index: Dict[int, List[str]]) -> None:
+    """Store the mask index next to the dictionary; a read-only directory just means no cache."""
+    cache_path = mask_index_cache_path(dict_path)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((mask_index_cache_key(dict_path), mask_index), f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write mask index cache: {e}", file=sys.stderr)
+
+
+def build_lowercase_index(dict_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map each lowercased dictionary key to its value; the first key in dictionary order wins."""
+    lowercase_index: Dict[str, Any] = {}
+    for key, value in dict_data.items():
+        lowercase_index.setdefault(key.lower(), value)
+    return lowercase_index
+
+
+def save_puzzle_json(puzzle_data: Dict[str, Any], output_path: Path) -> None:
+    """Write the puzzle as indented UTF-8 JSON, using orjson when it is available."""
+    if orjson is not None:
+        output_path.write_bytes(orjson.dumps(puzzle_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(puzzle_data, f, indent=2, ensure_ascii=False)
+
+
+def get_word_definition(
+    word: str,
+    dict_data: Dict[str, Any],
+    lowercase_index: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Get definition for a word from dictionary data.
+    Pass a build_lowercase_index result when looking up many words, so the
+    case-insensitive fallback is a dict lookup instead of a scan of dict_data.
+    """
     # Try exact match (lowercase)
     word_lower = word.lower()
     if word_lower in dict_data:
         return dict_data[word_lower]
     
     # Try case-insensitive match
+    if lowercase_index is not None:
+        return lowercase_index.get(word_lower, "No definition available")
     for key, value in dict_data.items():
         if key.lower() == word_lower:
             return value
@@ -184,7 +299,7 @@ def generate_puzzle_json(
     words_with_freq = []
     for word in valid_words:
         try:
-            freq = word_frequency(word, 'en')
+            freq = english_frequency(word)
         except Exception:
             freq = 0.0
         
@@ -194,9 +309,10 @@ def generate_puzzle_json(
     words_with_freq.sort(key=lambda x: (-x[1], x[0]))
     
     # Build result with definitions
+    lowercase_index = build_lowercase_index(dict_data)
     word_entries = []
     for word, freq in words_with_freq:
-        definition = get_word_definition(word, dict_data)
+        definition = get_word_definition(word, dict_data, lowercase_index)
         word_entries.append({
             "word": word,
             "frequency": freq,
@@ -355,6 +471,12 @@ Examples:
         default=MIN_WORDS_REQUIRED,
         help=f'Minimum number of words required (default: {MIN_WORDS_REQUIRED})'
     )
+    parser.add_argument(
+        '--index-cache',
+        action='store_true',
+        help='Cache the mask index next to the dictionary (<dictionary>.mask_index.pkl) and reuse it '
+             'while the dictionary and index_mask_dictionary are unchanged'
+    )
     
     args = parser.parse_args()
 
@@ -395,9 +517,15 @@ Examples:
     print(f"✓ Loaded {len(words)} words from dictionary")
     print()
     
-    # Build mask index
-    print("Building mask index (this may take a moment)...")
-    mask_index = build_mask_index(words, min_len=MIN_WORD_LENGTH)
+    # Build mask index, or reuse the one cached for this version of the dictionary
+    mask_index = load_cached_mask_index(dict_path) if args.index_cache else None
+    if mask_index is not None:
+        print(f"Loaded mask index from: {mask_index_cache_path(dict_path)}")
+    else:
+        print("Building mask index (this may take a moment)...")
+        mask_index = build_mask_index(words, min_len=MIN_WORD_LENGTH)
+        if args.index_cache:
+            save_cached_mask_index(dict_path, mask_index)
     indexed_count = sum(len(v) for v in mask_index.values())
     print(f"✓ Indexed {indexed_count} words (length >= {MIN_WORD_LENGTH})")
     print()
@@ -476,8 +604,7 @@ Examples:
 
     # Save puzzle JSON
     print(f"Saving puzzle to: {output_path}")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(puzzle_data, f, indent=2, ensure_ascii=False)
+    save_puzzle_json(puzzle_data, output_path)
     print(f"✓ Saved puzzle JSON")
     print()
 
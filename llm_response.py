@@ -0,0 +1,112 @@
+"""
+Shared helpers for reading Ollama output in the LLM scripts (create_contextual_seed_word.py,
+filter_and_prune_words.py, generate_ema_questions.py, generate_full_contextual_clues.py and
+generate_generic_clues.py): finding JSON objects or arrays in generated text, and the
+on-disk response cache.
+"""
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+# Responses that parsed to usable JSON, one file per cache key
+LLM_CACHE_DIR = Path(".llm_cache")
+
+# Closing bracket for each opening bracket JsonScanner can look for
+CLOSING_BRACKETS = {'{': '}', '[': ']'}
+
+
+class JsonScanner:
+    """Incrementally find balanced top-level JSON objects ('{') or arrays ('[') in text fed chunk by chunk.
+
+    Tracks bracket depth plus string/escape state, so brackets inside JSON strings are
+    ignored. Text outside of a span (prose, markdown fences) is skipped.
+    """
+
+    def __init__(self, opener: str = '{'):
+        self._open = opener
+        self._close = CLOSING_BRACKETS[opener]
+        self._chunks: List[str] = []
+        self._offset = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """Consume the next chunk of text and return any spans it completed."""
+        completed = []
+        base = self._offset
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+
+        for i, char in enumerate(chunk):
+            if self._depth == 0:
+                if char == self._open:
+                    self._start = base + i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == self._open:
+                self._depth += 1
+            elif char == self._close:
+                self._depth -= 1
+                if self._depth == 0:
+                    text = ''.join(self._chunks)
+                    self._chunks = [text]
+                    completed.append(text[self._start:base + i + 1])
+
+        return completed
+
+
+def find_json_spans(text: str, opener: str = '{') -> List[str]:
+    """Return every balanced top-level JSON object ('{') or array ('[') span in text, in order."""
+    return JsonScanner(opener).feed(text)
+
+
+def cache_prefix(*parts: str):
+    """
+    Hash state for the leading parts of a cache key. Copying it for each request means
+    a long shared part (such as a diary system prompt) is hashed only once;
+    cache_key(prompt, prefix=cache_prefix(a, b)) equals cache_key(a, b, prompt).
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update("".join(f"{part}\n" for part in parts).encode("utf-8"))
+    return hasher
+
+
+def cache_key(*parts: str, prefix=None) -> str:
+    """Hash the parts (model, settings, prompt, ...) into a response cache key, after prefix if given."""
+    hasher = prefix.copy() if prefix is not None else hashlib.blake2b(digest_size=16)
+    hasher.update("\n".join(parts).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def cache_get(key: str) -> Optional[str]:
+    """Return the cached response for a key, or None on a miss."""
+    try:
+        return (LLM_CACHE_DIR / f"{key}.json").read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def cache_put(key: str, response: str) -> None:
+    """Store a response, writing a temp file first so readers never see a partial entry."""
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=LLM_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding="utf-8") as f:
+            f.write(response)
+        os.replace(tmp_path, LLM_CACHE_DIR / f"{key}.json")
+    except OSError as e:
+        print(f"Warning: Could not write response cache: {e}", file=sys.stderr)